@@ -0,0 +1,52 @@
+import shutil
+
+import pytest
+
+from newsletter import cache
+
+from fixtures import make_papers
+
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    """Disable the on-disk cache."""
+    monkeypatch.delenv("NEWSLETTER_CACHE_DIR", raising=False)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the cache at an empty temporary directory."""
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    yield tmp_path
+    cache.flush()
+
+
+@pytest.fixture(scope="session")
+def cache_templates(tmp_path_factory):
+    """Directories of indexed caches holding ``make_papers(count)`` by count."""
+    return {}
+
+
+@pytest.fixture
+def filled_cache(cache_dir, cache_templates, tmp_path_factory, monkeypatch):
+    """Return a function filling the cache with ``make_papers(count)``.
+
+    Each cache is written and indexed once per session and copied for every
+    benchmark that reads it.  The function returns the papers.
+    """
+
+    def fill(count):
+        template = cache_templates.get(count)
+        if template is None:
+            template = tmp_path_factory.mktemp(f"cache-{count}")
+            monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(template))
+            for paper in make_papers(count):
+                cache.set_paper(paper.arxiv_url, paper.to_dict())
+            cache.flush()
+            cache._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            cache_templates[count] = template
+        shutil.copy(template / "papers.sqlite3", cache_dir / "papers.sqlite3")
+        monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(cache_dir))
+        return make_papers(count)
+
+    return fill
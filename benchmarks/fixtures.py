@@ -0,0 +1,101 @@
+"""Synthetic inputs for the benchmark suite.
+
+Pages and papers are generated deterministically so that runs are comparable
+and no network access is needed.
+"""
+
+import random
+from datetime import date, timedelta
+from functools import lru_cache
+
+from newsletter.paper import Paper
+
+# Number of papers in the small, medium and large fixtures
+SIZES = (1_000, 10_000, 100_000)
+
+_WORDS = (
+    "learning neural agents language model reasoning graph policy transformer "
+    "reinforcement inference benchmark diffusion retrieval alignment planning"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def abs_page(index: int, *, authors: int = 8, body_size: int = 30_000) -> str:
+    """Return an arXiv-like abs page with citation tags and a large body."""
+
+    rng = random.Random(index)
+    meta = [f'<meta name="citation_title" content="{_text(rng, 10)}" />']
+    meta += [
+        f'<meta name="citation_author" content="Author{rng.randrange(5000)}, A." />'
+        for _ in range(authors)
+    ]
+    meta.append('<meta name="citation_date" content="2024/01/15" />')
+    meta.append(f'<meta name="citation_abstract" content="{_text(rng, 150)}" />')
+    body = f"<p>{_text(rng, 10)}</p>\n" * (body_size // 100)
+    return (
+        "<!DOCTYPE html>\n<html><head><title>arXiv</title>\n"
+        + "\n".join(meta)
+        + "\n</head><body>\n"
+        + body
+        + "</body></html>"
+    )
+
+
+def listing_page(entries: int) -> str:
+    """Return a listing page linking ``entries`` abs pages."""
+
+    items = "".join(
+        f'<dt><a href="/abs/2401.{i:05d}" title="Abstract">arXiv:2401.{i:05d}</a>'
+        f' [<a href="/pdf/2401.{i:05d}">pdf</a>]</dt><dd>Title {i}</dd>\n'
+        for i in range(entries)
+    )
+    return f"<html><body><dl>\n{items}</dl></body></html>"
+
+
+def atom_feed(entries: int) -> str:
+    """Return an export API feed with ``entries`` records."""
+
+    rng = random.Random(entries)
+    items = "".join(
+        f"<entry><id>http://arxiv.org/abs/2401.{i:05d}v1</id>"
+        f"<published>2024-01-15T00:00:00Z</published>"
+        f"<title>{_text(rng, 10)}</title><summary>{_text(rng, 150)}</summary>"
+        + "".join(f"<author><name>Author {j}</name></author>" for j in range(8))
+        + "</entry>"
+        for i in range(entries)
+    )
+    return f'<feed xmlns="http://www.w3.org/2005/Atom">{items}</feed>'
+
+
+def make_papers(count: int) -> list[Paper]:
+    """Return ``count`` papers with varied search results and dates.
+
+    The papers are generated once per ``count`` and shared between
+    benchmarks, which must not modify them except for their scores.
+    """
+
+    return list(_papers(count))
+
+
+@lru_cache(maxsize=None)
+def _papers(count: int) -> tuple[Paper, ...]:
+    rng = random.Random(count)
+    return tuple(
+        Paper(
+            arxiv_url=f"https://arxiv.org/abs/2401.{i:05d}",
+            title=_text(rng, 10),
+            abstract=_text(rng, 150),
+            authors=[
+                f"Author {rng.randrange(5000)}" for _ in range(rng.randint(1, 12))
+            ],
+            submission_date=date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+            google_results=[
+                f"https://example.org/{j}" for j in range(rng.randrange(10))
+            ],
+            categories=rng.sample(["cs.AI", "cs.LG", "cs.CL", "stat.ML"], 2),
+        )
+        for i in range(count)
+    )
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from newsletter import cache
+
+from fixtures import SIZES, make_papers
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_set_paper_and_flush(benchmark, cache_dir, count):
+    records = [(p.arxiv_url, p.to_dict()) for p in make_papers(count)]
+
+    def write():
+        for url, record in records:
+            cache.set_paper(url, record)
+        cache.flush()
+
+    benchmark.pedantic(write, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_get_paper(benchmark, filled_cache, count):
+    urls = [paper.arxiv_url for paper in filled_cache(count)]
+    sample = random.Random(0).sample(urls, 1000)
+
+    def read():
+        for url in sample:
+            cache.get_paper(url)
+
+    benchmark(read)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_update_paper(benchmark, filled_cache, count):
+    papers = filled_cache(count)
+    sample = [p.arxiv_url for p in random.Random(0).sample(papers, 1000)]
+
+    def update():
+        for url in sample:
+            cache.update_paper(url, {"google_results": ["g"]})
+        cache.flush()
+
+    benchmark(update)
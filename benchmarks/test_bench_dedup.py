@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+from newsletter import dedup
+
+from fixtures import SIZES, make_papers
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_find_duplicate(benchmark, filled_cache, count):
+    papers = filled_cache(count)
+    sample = random.Random(0).sample(papers, 100)
+
+    def find():
+        for paper in sample:
+            dedup.find_duplicate(paper.title, paper.abstract, exclude=paper.arxiv_url)
+
+    benchmark(find)
+
+
+def test_signature(benchmark):
+    papers = make_papers(1_000)
+
+    def sign():
+        for paper in papers:
+            dedup.signature(paper.title, paper.abstract)
+
+    benchmark(sign)
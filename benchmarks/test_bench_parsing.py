@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import pytest
+
+from newsletter import arxiv
+from newsletter.paper import Paper, parse_abs_page
+from newsletter.parsing import ParserPool
+from newsletter.utils import parse_citation_meta, soup_citation_meta
+
+from fixtures import abs_page, atom_feed, listing_page
+
+PAGE = abs_page(0)
+
+
+def test_parse_citation_meta(benchmark):
+    meta = benchmark(parse_citation_meta, PAGE)
+    assert len(meta["citation_author"]) == 8
+
+
+def test_soup_citation_meta(benchmark):
+    meta = benchmark(soup_citation_meta, PAGE)
+    assert len(meta["citation_author"]) == 8
+
+
+def test_from_html(benchmark, no_cache):
+    paper = benchmark(Paper.from_html, "https://arxiv.org/abs/2401.00000", PAGE)
+    assert paper.title
+
+
+@pytest.mark.parametrize("entries", [500, 2000])
+def test_parse_listing(benchmark, entries):
+    html = listing_page(entries)
+    assert len(benchmark(arxiv._parse_listing, html)) == entries
+
+
+def test_parse_atom_feed(benchmark):
+    xml = atom_feed(100)
+    assert len(benchmark(arxiv.parse_atom_feed, xml)) == 100
+
+
+PAGES = [abs_page(i) for i in range(500)]
+
+
+def test_parse_pages_inline(benchmark):
+    benchmark.pedantic(lambda: [parse_abs_page(p) for p in PAGES], rounds=3)
+
+
+def test_parse_pages_in_pool(benchmark):
+    async def parse_all(pool):
+        return await asyncio.gather(*(pool.parse(p) for p in PAGES))
+
+    with ParserPool(os.cpu_count()) as pool:
+        # Start the workers before timing
+        asyncio.run(parse_all(pool))
+        benchmark.pedantic(lambda: asyncio.run(parse_all(pool)), rounds=3)
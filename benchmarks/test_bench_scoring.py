@@ -0,0 +1,19 @@
+import pytest
+
+from newsletter import scoring
+from newsletter.paper import Paper
+
+from fixtures import SIZES, make_papers
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_compute_scores_default(benchmark, count):
+    papers = make_papers(count)
+    benchmark(Paper.compute_scores, papers)
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_score_all_signals(benchmark, count):
+    papers = make_papers(count)
+    weights = dict.fromkeys(scoring.SIGNALS, 1.0)
+    benchmark(scoring.score_papers, papers, weights=weights, normalization="zscore")
@@ -0,0 +1,19 @@
+import pytest
+
+from newsletter.paper import Paper
+from newsletter.utils import dumps, loads
+
+from fixtures import SIZES, make_papers
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_write_jsonl(benchmark, count):
+    papers = make_papers(count)
+    benchmark(lambda: "\n".join(dumps(p.to_dict()) for p in papers))
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_read_jsonl(benchmark, count):
+    lines = [dumps(p.to_dict()) for p in make_papers(count)]
+    papers = benchmark(lambda: [Paper.from_dict(loads(line)) for line in lines])
+    assert len(papers) == count
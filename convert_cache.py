@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""Convert a legacy ``papers.json`` cache into the SQLite paper cache."""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+from newsletter import cache
+
+
+def convert(source: str | os.PathLike, cache_dir: str | os.PathLike) -> int:
+    """Import the records of ``source`` into the cache in ``cache_dir``.
+
+    Returns the number of imported records.  Records already in the cache
+    with the same URL are overwritten.
+    """
+
+    os.environ["NEWSLETTER_CACHE_DIR"] = str(cache_dir)
+    count = cache.import_json(Path(source))
+    cache.flush()
+    return count
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="legacy papers.json file")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("NEWSLETTER_CACHE_DIR"),
+        help="cache directory (default: $NEWSLETTER_CACHE_DIR, else the "
+        "directory of SOURCE)",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    convert(args.source, args.cache_dir or Path(args.source).parent)
@@ -1,6 +1,29 @@
-"""Public package API for :mod:`newsletter`."""
+"""Public package API for :mod:`newsletter`.
 
-from .arxiv import get_recent_arxiv_urls
-from .paper import Paper
+Names are imported on first access so that ``import newsletter`` and the
+command line interface start without loading the HTTP and HTML libraries.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .arxiv import get_recent_arxiv_urls
+    from .paper import Paper
 
 __all__ = ["get_recent_arxiv_urls", "Paper"]
+
+# Public name -> module defining it
+_EXPORTS = {"get_recent_arxiv_urls": ".arxiv", "Paper": ".paper"}
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
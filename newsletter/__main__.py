@@ -0,0 +1,5 @@
+"""Run the ``newsletter`` command with ``python -m newsletter``."""
+
+from .cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,198 @@
+"""Compressed archive of raw abs pages.
+
+Set ``NEWSLETTER_ARCHIVE_DIR`` to keep every fetched abs page so that papers
+can be parsed again after the extraction logic changes, without refetching
+them.  Pages are compressed with zstd when :mod:`zstandard` is installed and
+gzip otherwise, and appended to pack files of up to :data:`PACK_SIZE` bytes.
+
+An append-only index maps each URL to the SHA-256 of its content and the
+location of the blob.  It is read into memory when the archive is opened, so
+URLs are listed and looked up without touching the pack files, which are
+memory-mapped for reading.  The newest entry of a URL wins and a page whose
+content did not change is not stored again.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Iterator
+
+try:  # optional, better and faster compression
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Size in bytes after which a new pack file is started
+PACK_SIZE = 256 * 1024 * 1024
+
+# Content sha256, pack number, offset, length, codec and URL length of an
+# index entry, which is followed by the URL
+_ENTRY = struct.Struct("<32sIQIBH")
+# URL and blob lengths preceding each record in a pack file
+_RECORD = struct.Struct("<HI")
+_GZIP, _ZSTD = 0, 1
+
+
+def _archive_dir() -> Path | None:
+    directory = os.environ.get("NEWSLETTER_ARCHIVE_DIR")
+    return Path(directory) if directory else None
+
+
+def _compress(data: bytes) -> tuple[bytes, int]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data), _ZSTD
+    return gzip.compress(data), _GZIP
+
+
+def _decompress(blob: bytes, codec: int) -> bytes:
+    if codec == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this archive")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def _encode_entry(url: str, entry: tuple[bytes, int, int, int, int]) -> bytes:
+    encoded = url.encode()
+    return _ENTRY.pack(*entry, len(encoded)) + encoded
+
+
+class Archive:
+    """Pack files and index of an archive directory."""
+
+    def __init__(self, directory: str | os.PathLike) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # url -> (content hash, pack, offset, length, codec)
+        self._entries: dict[str, tuple[bytes, int, int, int, int]] = {}
+        self._maps: dict[int, mmap.mmap] = {}
+        self._load_index()
+        self._index = open(self.directory / "index", "ab")
+        self._pack = max((entry[1] for entry in self._entries.values()), default=0)
+
+    def _load_index(self) -> None:
+        path = self.directory / "index"
+        if not path.exists():
+            return
+        data = path.read_bytes()
+        offset = 0
+        while offset + _ENTRY.size <= len(data):
+            *entry, url_length = _ENTRY.unpack_from(data, offset)
+            end = offset + _ENTRY.size + url_length
+            if end > len(data):
+                break
+            self._entries[data[offset + _ENTRY.size : end].decode()] = tuple(entry)
+            offset = end
+        if offset < len(data):
+            # Drop a partial entry left by an interrupted write
+            os.truncate(path, offset)
+        logger.debug("Loaded %d archived pages", len(self._entries))
+
+    def _pack_path(self, number: int) -> Path:
+        return self.directory / f"pack-{number:05d}.pack"
+
+    def _map(self, number: int) -> mmap.mmap:
+        with open(self._pack_path(number), "rb") as fh:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def store(self, url: str, html: str) -> str:
+        """Archive ``html`` as the content of ``url`` and return its SHA-256."""
+        data = html.encode()
+        digest = hashlib.sha256(data).digest()
+        with self._lock:
+            current = self._entries.get(url)
+            if current is not None and current[0] == digest:
+                return digest.hex()
+            blob, codec = _compress(data)
+            encoded = url.encode()
+            path = self._pack_path(self._pack)
+            if path.exists() and path.stat().st_size >= PACK_SIZE:
+                self._pack += 1
+                path = self._pack_path(self._pack)
+            with open(path, "ab") as pack:
+                offset = pack.tell()
+                pack.write(_RECORD.pack(len(encoded), len(blob)) + encoded + blob)
+            length = _RECORD.size + len(encoded) + len(blob)
+            entry = (digest, self._pack, offset, length, codec)
+            self._index.write(_encode_entry(url, entry))
+            self._index.flush()
+            self._entries[url] = entry
+        return digest.hex()
+
+    def _read(self, entry: tuple[bytes, int, int, int, int]) -> bytes:
+        _, number, offset, length, codec = entry
+        with self._lock:
+            pack = self._maps.get(number)
+            # Pack files grow, so a map is renewed when an entry lies past its end
+            if pack is None or offset + length > len(pack):
+                if pack is not None:
+                    pack.close()
+                pack = self._maps[number] = self._map(number)
+            record = pack[offset : offset + length]
+        url_length, blob_length = _RECORD.unpack_from(record)
+        start = _RECORD.size + url_length
+        return _decompress(record[start : start + blob_length], codec)
+
+    def load(self, url: str) -> str | None:
+        """Return the newest archived content of ``url``."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        return self._read(entry).decode()
+
+    def urls(self) -> Iterator[str]:
+        """Yield every archived URL once, without reading the pack files."""
+        yield from list(self._entries)
+
+    def close(self) -> None:
+        with self._lock:
+            self._index.close()
+            for pack in self._maps.values():
+                pack.close()
+            self._maps.clear()
+
+
+_archive: Archive | None = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Archive | None:
+    """Return the archive of ``NEWSLETTER_ARCHIVE_DIR`` or ``None`` if unset."""
+    global _archive
+    directory = _archive_dir()
+    with _archive_lock:
+        if _archive is not None and _archive.directory != directory:
+            _archive.close()
+            _archive = None
+        if _archive is None and directory is not None:
+            _archive = Archive(directory)
+        return _archive
+
+
+def store(url: str, html: str) -> None:
+    """Archive ``html`` for ``url`` if archiving is enabled."""
+    archive = get_archive()
+    if archive is not None:
+        archive.store(url, html)
+
+
+def load(url: str) -> str | None:
+    """Return the archived page of ``url`` if archiving is enabled."""
+    archive = get_archive()
+    return None if archive is None else archive.load(url)
@@ -2,41 +2,345 @@
 
 The primary entry point is :func:`get_recent_arxiv_urls` which returns the
 fully-qualified URLs of papers appearing on the recent cs.AI listing page.
+:func:`iter_recent_arxiv_urls` and :func:`aiter_recent_arxiv_urls` walk the
+listing page by page and yield URLs as soon as each page is parsed.
+:func:`get_recent_listings` and :func:`aiter_recent_listings` fetch several
+category listings concurrently, deduplicate cross-listed papers by arXiv
+identifier and record the categories each paper was listed in.
+:func:`fetch_metadata` retrieves metadata for many papers at once from the
+arXiv export API.
 """
 
+import asyncio
+import itertools
 import logging
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, Iterator
 from urllib.parse import urljoin
 
+import httpx
 import requests
 from bs4 import BeautifulSoup
 
+from . import cache, client, metrics
+
 BASE_URL = "https://arxiv.org"
 RECENT_URL = f"{BASE_URL}/list/cs.AI/recent?skip=0&show=2000"
+EXPORT_URL = "https://export.arxiv.org/api/query"
+
+# Category of the single-category listing functions
+CATEGORY = "cs.AI"
+# Categories covered by the newsletter
+CATEGORIES = ("cs.AI", "cs.LG", "cs.CL", "stat.ML")
 
-# User agent to avoid being blocked by arXiv when running outside tests
-HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; newsletter/1.0)"}
+# Number of listing entries requested per page when streaming the listing
+PAGE_SIZE = 500
+# Number of identifiers requested per export API query
+BATCH_SIZE = 100
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_VERSION = re.compile(r"v\d+$")
 
 logger = logging.getLogger(__name__)
 
 
-def get_recent_arxiv_urls() -> list[str]:
-    """Return a sorted list of unique arXiv paper URLs from the cs.AI listing."""
+def listing_url(skip: int = 0, show: int = 2000, category: str = CATEGORY) -> str:
+    """Return the URL of one page of the recent listing of ``category``."""
+    return f"{BASE_URL}/list/{category}/recent?skip={skip}&show={show}"
+
+
+def _parse_listing(html: str) -> list[str]:
+    """Return the unique paper URLs linked from a listing page in page order."""
+    soup = BeautifulSoup(html, "html.parser")
+    paths: dict[str, None] = {}
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if href.startswith("/abs/"):
+            paths[href] = None
+    return [urljoin(BASE_URL, path) for path in paths]
+
 
-    logger.info("Requesting %s", RECENT_URL)
-    response = requests.get(RECENT_URL, timeout=10, headers=HEADERS)
+def _listing_result(
+    url: str, response: requests.Response | httpx.Response, cached: dict | None
+) -> list[str]:
+    """Return the URLs of a listing ``response``, caching them with validators."""
+    if response.status_code == 304 and cached is not None:
+        logger.info("%s not modified; using %d cached URLs", url, len(cached["data"]))
+        metrics.increment("listing_not_modified")
+        return cached["data"]
     response.raise_for_status()
     logger.debug(
         "Received response (status %s) with %d characters",
         getattr(response, "status_code", "unknown"),
         len(response.text),
     )
-    soup = BeautifulSoup(response.text, "html.parser")
-    paths: list[str] = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if href.startswith("/abs/"):
-            paths.append(href)
+    with metrics.timer("listing_parse_seconds"):
+        urls = _parse_listing(response.text)
+    found = client.validators(response)
+    if found:
+        cache.set_response(url, found, urls)
+    return urls
+
+
+def _listing_page(url: str, *, session: requests.Session | None = None) -> list[str]:
+    logger.info("Requesting %s", url)
+    cached = cache.get_response(url)
+    with metrics.timer("listing_fetch_seconds"):
+        response = client.get(
+            url,
+            session=session,
+            headers=client.conditional_headers(cached and cached["validators"]),
+        )
+    return _listing_result(url, response, cached)
+
+
+async def _alisting_page(
+    url: str, *, http_client: httpx.AsyncClient | None = None
+) -> list[str]:
+    logger.info("Requesting %s", url)
+    cached = cache.get_response(url)
+    with metrics.timer("listing_fetch_seconds"):
+        response = await client.aget(
+            url,
+            http_client=http_client,
+            headers=client.conditional_headers(cached and cached["validators"]),
+        )
+    return _listing_result(url, response, cached)
+
+
+def get_recent_arxiv_urls(*, session: requests.Session | None = None) -> list[str]:
+    """Return a sorted list of unique arXiv paper URLs from the cs.AI listing.
+
+    ``session`` overrides the shared HTTP session from :mod:`newsletter.client`.
+    When caching is enabled the listing is revalidated with a conditional
+    request and an unchanged listing is served from the cache.
+    """
+
+    urls = sorted(_listing_page(RECENT_URL, session=session))
+    logger.info("Found %d unique URLs", len(urls))
+    return urls
+
+
+def iter_recent_arxiv_urls(
+    *,
+    category: str = CATEGORY,
+    page_size: int = PAGE_SIZE,
+    session: requests.Session | None = None,
+) -> Iterator[str]:
+    """Yield unique paper URLs from a category listing one page at a time.
+
+    Pages of ``page_size`` entries are requested with ``skip=``/``show=``
+    until a page adds no new URLs, and each page's URLs are yielded before
+    the next page is requested.
+    """
+
+    seen: set[str] = set()
+    for skip in itertools.count(0, page_size):
+        url = listing_url(skip, page_size, category)
+        found = _listing_page(url, session=session)
+        new = [paper_url for paper_url in found if paper_url not in seen]
+        seen.update(new)
+        yield from new
+        if not new or len(found) < page_size:
+            break
+    logger.info("Found %d unique URLs", len(seen))
+
+
+async def aiter_recent_arxiv_urls(
+    *,
+    category: str = CATEGORY,
+    page_size: int = PAGE_SIZE,
+    http_client: httpx.AsyncClient | None = None,
+) -> AsyncIterator[str]:
+    """Asynchronous counterpart of :func:`iter_recent_arxiv_urls`."""
+
+    seen: set[str] = set()
+    for skip in itertools.count(0, page_size):
+        url = listing_url(skip, page_size, category)
+        found = await _alisting_page(url, http_client=http_client)
+        new = [paper_url for paper_url in found if paper_url not in seen]
+        seen.update(new)
+        for paper_url in new:
+            yield paper_url
+        if not new or len(found) < page_size:
+            break
+    logger.info("Found %d unique URLs", len(seen))
+
+
+def _merge_listing(
+    seen: dict[str, list[str]], url: str, category: str
+) -> list[str] | None:
+    """Record ``url`` as listed in ``category``.
+
+    Returns the new category list if this is the first listing of the paper
+    and ``None`` if it is a cross-listing of a paper already seen.
+    """
+    ident = arxiv_id(url)
+    if ident in seen:
+        if category not in seen[ident]:
+            seen[ident].append(category)
+        return None
+    seen[ident] = [category]
+    return seen[ident]
+
+
+def get_recent_listings(
+    categories: Iterable[str] = CATEGORIES,
+    *,
+    page_size: int = PAGE_SIZE,
+    session: requests.Session | None = None,
+) -> dict[str, list[str]]:
+    """Return the recent papers of several categories with their categories.
+
+    The listings are fetched concurrently and deduplicated by arXiv
+    identifier.  The result maps each paper URL to the categories it is
+    listed in, in the order of ``categories``.
+    """
+
+    categories = list(categories)
+    with ThreadPoolExecutor(max_workers=max(len(categories), 1)) as pool:
+        listings = pool.map(
+            lambda category: list(
+                iter_recent_arxiv_urls(
+                    category=category, page_size=page_size, session=session
+                )
+            ),
+            categories,
+        )
+        seen: dict[str, list[str]] = {}
+        papers: dict[str, list[str]] = {}
+        for category, urls in zip(categories, listings):
+            for url in urls:
+                listed = _merge_listing(seen, url, category)
+                if listed is not None:
+                    papers[url] = listed
+    logger.info("Found %d unique papers in %d categories", len(papers), len(categories))
+    return papers
+
+
+async def aiter_recent_listings(
+    categories: Iterable[str] = CATEGORIES,
+    *,
+    page_size: int = PAGE_SIZE,
+    http_client: httpx.AsyncClient | None = None,
+) -> AsyncIterator[tuple[str, list[str]]]:
+    """Yield ``(url, categories)`` for the recent papers of several categories.
+
+    The category listings are streamed concurrently and each paper is
+    yielded once, the first time any listing reaches it, so per-paper work
+    can start immediately without being repeated for cross-listings.  The
+    yielded category list is extended in place when the paper appears in
+    another listing and is complete once iteration finishes.
+    """
+
+    categories = list(categories)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=page_size)
+    done = object()
+
+    async def pump(category: str) -> None:
+        try:
+            async for url in aiter_recent_arxiv_urls(
+                category=category, page_size=page_size, http_client=http_client
+            ):
+                await queue.put((url, category))
+        finally:
+            await queue.put(done)
+
+    tasks = [asyncio.create_task(pump(category)) for category in categories]
+    seen: dict[str, list[str]] = {}
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is done:
+                remaining -= 1
+                continue
+            url, category = item
+            listed = _merge_listing(seen, url, category)
+            if listed is not None:
+                yield url, listed
+        # Re-raise the error of a listing that failed
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    logger.info("Found %d unique papers in %d categories", len(seen), len(categories))
+
+
+def arxiv_id(url: str) -> str:
+    """Return the arXiv identifier of ``url`` without its version suffix.
+
+    ``url`` may be an ``abs`` URL or a bare identifier.
+    """
+    return _VERSION.sub("", url.rsplit("/abs/", 1)[-1])
+
+
+def abs_url(ident: str) -> str:
+    """Return the ``abs`` page URL for ``ident`` (URLs are returned unchanged)."""
+    if "/abs/" in ident:
+        return ident
+    return urljoin(BASE_URL, f"/abs/{ident}")
+
+
+def _text(entry: ET.Element, tag: str) -> str:
+    return " ".join((entry.findtext(f"{_ATOM}{tag}") or "").split())
+
+
+def parse_atom_feed(xml: str) -> list[dict]:
+    """Return metadata records from an arXiv export API Atom feed.
+
+    Each record holds the versionless ``id`` plus ``title``, ``abstract``,
+    ``authors`` and the ISO ``submission_date`` of the first version.  Author
+    names are given as the API reports them (``"First Last"``).
+    """
+
+    records = []
+    for entry in ET.fromstring(xml).iter(f"{_ATOM}entry"):
+        entry_id = entry.findtext(f"{_ATOM}id") or ""
+        if "/abs/" not in entry_id:
+            # The API reports unknown identifiers as error entries
+            logger.debug("Skipping feed entry %s", entry_id)
+            continue
+        records.append(
+            {
+                "id": arxiv_id(entry_id),
+                "title": _text(entry, "title"),
+                "abstract": _text(entry, "summary"),
+                "authors": [
+                    _text(author, "name") for author in entry.iter(f"{_ATOM}author")
+                ],
+                "submission_date": _text(entry, "published")[:10],
+            }
+        )
+    return records
+
+
+def fetch_metadata(
+    ids: Iterable[str],
+    *,
+    batch_size: int = BATCH_SIZE,
+    session: requests.Session | None = None,
+) -> Iterator[dict]:
+    """Yield export API metadata records for ``ids`` in batches.
+
+    ``ids`` may be identifiers or ``abs`` URLs; one request is made per
+    ``batch_size`` identifiers.  Identifiers unknown to the API are skipped.
+    """
 
-    unique_paths = sorted(set(paths))
-    logger.info("Found %d unique URLs", len(unique_paths))
-    return [urljoin(BASE_URL, path) for path in unique_paths]
+    ids = [arxiv_id(ident) for ident in ids]
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start : start + batch_size]
+        logger.info("Requesting metadata for %d papers from %s", len(batch), EXPORT_URL)
+        with metrics.timer("export_fetch_seconds"):
+            response = client.get(
+                EXPORT_URL,
+                session=session,
+                params={"id_list": ",".join(batch), "max_results": len(batch)},
+            )
+        response.raise_for_status()
+        with metrics.timer("export_parse_seconds"):
+            records = parse_atom_feed(response.text)
+        logger.debug("Received %d of %d records", len(records), len(batch))
+        yield from records
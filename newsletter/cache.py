@@ -1,20 +1,118 @@
-"""Simple JSON-based caching utilities for newsletter."""
+"""SQLite-backed caching utilities for newsletter.
+
+Paper records are stored one row per URL in ``papers.sqlite3`` inside the
+directory named by ``NEWSLETTER_CACHE_DIR``.  The database runs in WAL mode so
+each :func:`set_paper` call writes a single record instead of rewriting the
+whole cache.  A legacy ``papers.json`` found in the same directory is imported
+when the database is first created.
+
+Writes are buffered: :func:`set_paper` and :func:`update_paper` only record the
+entry as dirty under a lock, and dirty entries are written in one transaction
+once :data:`FLUSH_SIZE` of them accumulate, :data:`FLUSH_INTERVAL` seconds
+after the first one, or when :func:`flush` is called explicitly.
+
+:func:`get_response` and :func:`set_response` keep the HTTP validators
+(``ETag``/``Last-Modified``) and parse result of pages that are not papers,
+such as listings, so they can be revalidated with conditional requests.
+
+The cache is bounded for long-lived deployments.  Each field of a record
+remembers when it was written and fields listed in :data:`FIELD_TTL` (search
+results by default) are dropped from lookups once they expire, so they are
+refreshed without refetching metadata.  Reads refresh a record's access time
+and, when :data:`MAX_ENTRIES` or :data:`MAX_BYTES` is set, the least recently
+used records are evicted on flush.  :func:`set_negative` stores short-lived
+entries for failed lookups so they are not retried immediately.
+
+Opening the cache only reads its schema, so startup does not grow with the
+cache: records are decoded one at a time as they are looked up through the
+primary key of ``papers``, and the file is memory-mapped for reading
+(:data:`MMAP_SIZE`).  Flushes and evictions also keep the indexes in
+:data:`_INDEXES` in sync: the full-text index of :mod:`newsletter.fulltext`,
+the near-duplicate index of :mod:`newsletter.dedup` and the author, date and
+title indexes queried by :mod:`newsletter.query`.  Flushes only queue the
+records for indexing: a background thread updates the indexes through a
+connection of its own, so neither lookups nor the writers that trigger a
+flush wait for them, and :func:`flush` returns when they are up to date.
+"""
 
 from __future__ import annotations
 
+import atexit
 import json
+import logging
 import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+from . import dedup, fulltext, metrics, query
+from .utils import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Number of dirty entries that triggers a flush
+FLUSH_SIZE = 500
+# Seconds after the first unflushed write before a background flush
+FLUSH_INTERVAL = 5.0
+# Number of flushed records indexed per transaction
+INDEX_BATCH_SIZE = 50
+
+# Maximum number of cached papers and total size of their data in bytes;
+# ``None`` disables the limit.  Least recently used papers are evicted first.
+MAX_ENTRIES: int | None = None
+MAX_BYTES: int | None = None
+# Seconds after which a field is dropped from lookups; fields not listed
+# never expire
+FIELD_TTL: dict[str, float] = {"google_results": 7 * 24 * 3600}
+# Lifetime of negative entries for failed lookups in seconds
+NEGATIVE_TTL = 3600.0
+# Bytes of the database file memory-mapped for reading
+MMAP_SIZE = 256 * 1024 * 1024
+# Seconds a connection waits while another one writes to the database
+BUSY_TIMEOUT = 30.0
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS papers (url TEXT PRIMARY KEY, data TEXT NOT NULL,"
+    " stamps TEXT NOT NULL DEFAULT '{}', accessed REAL NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS responses ("
+    "url TEXT PRIMARY KEY, validators TEXT NOT NULL, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS negative (url TEXT PRIMARY KEY, expires REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS indexes (name TEXT PRIMARY KEY)",
+)
+# Modules indexing the papers table; each provides SCHEMA, index_records and
+# remove_urls.  The ``indexes`` table records which of them have been built.
+_INDEXES = (fulltext, dedup, query)
+# Columns added to ``papers`` after its first release
+_PAPER_COLUMNS = {
+    "stamps": "TEXT NOT NULL DEFAULT '{}'",
+    "accessed": "REAL NOT NULL DEFAULT 0",
+}
+
+
+def _now() -> float:
+    return time.time()
+
 
 def _cache_file() -> Path | None:
-    """Return path to the paper cache file or ``None`` if caching is disabled."""
+    """Return path to the legacy JSON cache file or ``None`` if caching is disabled."""
     dir_ = os.getenv("NEWSLETTER_CACHE_DIR")
     if not dir_:
         return None
     return Path(dir_) / "papers.json"
 
 
+def _db_file() -> Path | None:
+    """Return path to the SQLite cache database or ``None`` if caching is disabled."""
+    path = _cache_file()
+    if path is None:
+        return None
+    return path.with_suffix(".sqlite3")
+
+
 def _load_cache(path: Path | None = None) -> dict[str, Any]:
     if path is None:
         path = _cache_file()
@@ -27,42 +125,464 @@ def _load_cache(path: Path | None = None) -> dict[str, Any]:
         return {}
 
 
-def _save_cache(path: Path | None, data: dict[str, Any]) -> None:
-    if path is None:
-        path = _cache_file()
-    if path is None:
-        return
+def _open(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path, check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT
+    )
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _connect(path: Path) -> sqlite3.Connection:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as fh:
-        json.dump(data, fh)
+    conn = _open(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    for index in _INDEXES:
+        for statement in index.SCHEMA:
+            conn.execute(statement)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(papers)")}
+    for name, definition in _PAPER_COLUMNS.items():
+        if name not in columns:
+            conn.execute(f"ALTER TABLE papers ADD COLUMN {name} {definition}")
+            if name == "stamps":
+                _stamp_legacy_rows(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS papers_accessed ON papers (accessed)")
+    built = {name for (name,) in conn.execute("SELECT name FROM indexes")}
+    stale = [index for index in _INDEXES if index.__name__ not in built]
+    if stale:
+        _build_indexes(conn, stale)
+    return conn
 
 
-_paper_cache: dict[str, Any] | None = None
-_cache_path: Path | None = None
+def _build_indexes(conn: sqlite3.Connection, indexes: list[Any]) -> None:
+    """Index the papers cached before ``indexes`` existed, once."""
+    records = [
+        (url, loads(data)) for url, data in conn.execute("SELECT url, data FROM papers")
+    ]
+    with _transaction(conn):
+        for index in indexes:
+            index.index_records(conn, records)
+        conn.executemany(
+            "INSERT OR IGNORE INTO indexes VALUES (?)",
+            ((index.__name__,) for index in indexes),
+        )
+    if records:
+        logger.info("Indexed %d cached papers", len(records))
 
 
-def get_paper(url: str) -> dict[str, Any] | None:
-    """Return cached paper data for ``url`` if available."""
-    global _paper_cache
-    path = _cache_file()
+def _stamp_legacy_rows(conn: sqlite3.Connection) -> None:
+    # Records written before fields were stamped count as written now
+    rows = conn.execute("SELECT url, data FROM papers").fetchall()
+    with _transaction(conn):
+        conn.executemany(
+            "UPDATE papers SET stamps = ? WHERE url = ?",
+            ((dumps(_stamps(loads(data))), url) for url, data in rows),
+        )
+
+
+def _stamps(record: dict[str, Any], now: float | None = None) -> dict[str, float]:
+    """Return write stamps marking every field of ``record`` as written ``now``."""
+    now = _now() if now is None else now
+    return {field: now for field in record}
+
+
+def _expire(record: dict[str, Any], stamps: dict[str, float]) -> dict[str, Any]:
+    """Drop fields of ``record`` whose TTL has passed."""
+    now = _now()
+    for field, ttl in FIELD_TTL.items():
+        if field in record and now - stamps.get(field, now) > ttl:
+            del record[field]
+            stamps.pop(field, None)
+    return record
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    # The cache and index connections both write.  They take turns on
+    # _write_lock, because SQLite's busy handler polls with growing sleeps
+    # and would let the index thread starve a flush; the database write lock
+    # is still taken up front, since upgrading a read transaction could fail
+    # instead of waiting.
+    with _write_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+_lock = threading.RLock()
+# Held by the write transactions of this process, see _transaction
+_write_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+_conn_path: Path | None = None
+# url -> (record, field write stamps) of entries not yet written
+_dirty: dict[str, tuple[dict[str, Any], dict[str, float]]] = {}
+# urls read since the last flush, whose access time must be refreshed
+_touched: set[str] = set()
+_timer: threading.Timer | None = None
+# (database, records, evicted urls) of flushes not yet indexed, in order
+_index_queue: queue.Queue[tuple[Path, list[tuple[str, dict[str, Any]]], list[str]]] = (
+    queue.Queue()
+)
+_index_thread: threading.Thread | None = None
+# Connection of the index thread, which never takes ``_lock``
+_index_conn: sqlite3.Connection | None = None
+_index_conn_path: Path | None = None
+
+
+def _connection(*, import_legacy: bool = True) -> sqlite3.Connection | None:
+    """Return a connection to the current cache database, opening it if needed.
+
+    A legacy ``papers.json`` next to a newly created database is imported
+    unless ``import_legacy`` is false.
+    """
+    global _conn, _conn_path
+    path = _db_file()
     if path is None:
         return None
-    global _cache_path
-    if _paper_cache is None or _cache_path != path:
-        _paper_cache = _load_cache(path)
-        _cache_path = path
-    return _paper_cache.get(url)
+    with _lock:
+        if _conn is None or _conn_path != path:
+            if _conn is not None:
+                _flush_locked()
+                _index_queue.join()
+                _conn.close()
+            created = not path.exists()
+            _conn = _connect(path)
+            _conn_path = path
+            legacy = path.with_suffix(".json")
+            if created and import_legacy and legacy.exists():
+                import_json(legacy)
+        return _conn
+
+
+def _flush_locked() -> int:
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+        _timer = None
+    if _conn is None or not (_dirty or _touched):
+        return 0
+    start = time.perf_counter()
+    now = _now()
+    rows = [
+        (url, dumps(record), dumps(stamps), now)
+        for url, (record, stamps) in _dirty.items()
+    ]
+    records = [(url, record) for url, (record, _) in _dirty.items()]
+    with _transaction(_conn):
+        _conn.executemany(
+            "INSERT OR REPLACE INTO papers (url, data, stamps, accessed)"
+            " VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        _conn.executemany(
+            "UPDATE papers SET accessed = ? WHERE url = ?",
+            ((now, url) for url in _touched - _dirty.keys()),
+        )
+        evicted = _evict(_conn)
+    _queue_index(_conn_path, records, evicted)
+    _dirty.clear()
+    _touched.clear()
+    metrics.observe("cache_flush_seconds", time.perf_counter() - start)
+    metrics.increment("cache_entries_flushed", len(rows))
+    metrics.increment("cache_evictions", len(evicted))
+    logger.debug("Flushed %d cache entries, evicted %d", len(rows), len(evicted))
+    return len(rows)
+
+
+def _queue_index(
+    path: Path, records: list[tuple[str, dict[str, Any]]], evicted: list[str]
+) -> None:
+    """Queue ``records`` and ``evicted`` URLs of ``path`` for the index thread."""
+    global _index_thread
+    _index_queue.put((path, records, evicted))
+    with _lock:
+        if _index_thread is None or not _index_thread.is_alive():
+            _index_thread = threading.Thread(
+                target=_index_worker, name="newsletter-cache-index", daemon=True
+            )
+            _index_thread.start()
+
+
+def _index_worker() -> None:
+    """Apply queued flushes to the indexes in :data:`_INDEXES`, forever."""
+    global _index_conn, _index_conn_path
+    while True:
+        path, records, evicted = _index_queue.get()
+        try:
+            if _index_conn is None or _index_conn_path != path:
+                if _index_conn is not None:
+                    _index_conn.close()
+                _index_conn = _open(path)
+                _index_conn_path = path
+            start = time.perf_counter()
+            # Short transactions, so that flushes get the write lock quickly
+            for i in range(0, len(records), INDEX_BATCH_SIZE):
+                with _transaction(_index_conn):
+                    for index in _INDEXES:
+                        index.index_records(
+                            _index_conn, records[i : i + INDEX_BATCH_SIZE]
+                        )
+                # Let a waiting flush take the write lock
+                time.sleep(0)
+            with _transaction(_index_conn):
+                for index in _INDEXES:
+                    index.remove_urls(_index_conn, evicted)
+            metrics.observe("cache_index_seconds", time.perf_counter() - start)
+        except Exception:
+            logger.exception("Could not index %d cache entries", len(records))
+        finally:
+            _index_queue.task_done()
+
+
+def _evict(conn: sqlite3.Connection) -> list[str]:
+    """Delete least recently used papers beyond the size limits.
+
+    Returns the URLs of the deleted papers.
+    """
+    victims: list[str] = []
+    if MAX_ENTRIES is not None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM papers").fetchone()
+        if count > MAX_ENTRIES:
+            victims = [
+                url
+                for (url,) in conn.execute(
+                    "SELECT url FROM papers ORDER BY accessed LIMIT ?",
+                    (count - MAX_ENTRIES,),
+                )
+            ]
+    if MAX_BYTES is not None:
+        (size,) = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM papers"
+        ).fetchone()
+        size -= sum(_size(conn, url) for url in victims)
+        if size > MAX_BYTES:
+            rows = conn.execute(
+                "SELECT url, LENGTH(data) FROM papers ORDER BY accessed LIMIT -1 OFFSET ?",
+                (len(victims),),
+            )
+            for url, length in rows:
+                if size <= MAX_BYTES:
+                    break
+                victims.append(url)
+                size -= length
+    conn.executemany("DELETE FROM papers WHERE url = ?", ((url,) for url in victims))
+    return victims
+
+
+def _size(conn: sqlite3.Connection, url: str) -> int:
+    row = conn.execute(
+        "SELECT LENGTH(data) FROM papers WHERE url = ?", (url,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def flush() -> int:
+    """Write all buffered entries to disk and return how many were written.
+
+    The indexes are up to date when this returns.
+    """
+    with _lock:
+        count = _flush_locked()
+    _index_queue.join()
+    return count
+
+
+def stats() -> dict[str, Any]:
+    """Return the location, size on disk and number of entries of the cache.
+
+    Pending writes are flushed first.  Returns an empty dictionary when
+    caching is disabled.
+    """
+    conn = _connection()
+    if conn is None:
+        return {}
+    flush()
+    with _lock:
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("papers", "responses", "negative")
+        }
+        path = _conn_path
+    files = (path, path.with_name(path.name + "-wal"))
+    size = sum(file.stat().st_size for file in files if file.exists())
+    return {"path": str(path), "bytes": size, **counts}
+
+
+def _schedule_locked() -> None:
+    global _timer
+    if len(_dirty) + len(_touched) >= FLUSH_SIZE:
+        _flush_locked()
+    elif _timer is None:
+        _timer = threading.Timer(FLUSH_INTERVAL, flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _mark_dirty(url: str, record: dict[str, Any], stamps: dict[str, float]) -> None:
+    _dirty[url] = (record, stamps)
+    _schedule_locked()
+
+
+atexit.register(flush)
+
+
+def import_json(path: Path) -> int:
+    """Import records from a legacy ``papers.json`` file into the cache.
+
+    Returns the number of imported records.  Existing entries with the same
+    URL are overwritten.
+    """
+    db = _db_file()
+    # Creating the database would import the same file on its own
+    legacy = (
+        db is not None and Path(path).resolve() == db.with_suffix(".json").resolve()
+    )
+    conn = _connection(import_legacy=not legacy)
+    if conn is None:
+        return 0
+    data = _load_cache(path)
+    now = _now()
+    with _lock:
+        with _transaction(conn):
+            conn.executemany(
+                "INSERT OR REPLACE INTO papers (url, data, stamps, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (
+                    (url, dumps(record), dumps(_stamps(record, now)), now)
+                    for url, record in data.items()
+                ),
+            )
+        _queue_index(_conn_path, list(data.items()), [])
+    _index_queue.join()
+    logger.info("Imported %d cached papers from %s", len(data), path)
+    return len(data)
+
+
+def get_paper(url: str) -> dict[str, Any] | None:
+    """Return cached paper data for ``url`` if available.
+
+    Fields whose TTL has expired are left out of the result.
+    """
+    conn = _connection()
+    if conn is None:
+        return None
+    with _lock:
+        found = _get_locked(conn, url)
+    metrics.increment("cache_misses" if found is None else "cache_hits")
+    return None if found is None else found[0]
+
+
+def _get_locked(
+    conn: sqlite3.Connection, url: str
+) -> tuple[dict[str, Any], dict[str, float]] | None:
+    if url in _dirty:
+        record, stamps = _dirty[url]
+        return _expire(dict(record), dict(stamps)), dict(stamps)
+    row = conn.execute(
+        "SELECT data, stamps FROM papers WHERE url = ?", (url,)
+    ).fetchone()
+    if row is None:
+        return None
+    _touched.add(url)
+    _schedule_locked()
+    stamps = loads(row[1])
+    return _expire(loads(row[0]), stamps), stamps
 
 
 def set_paper(url: str, data: dict[str, Any]) -> None:
     """Store ``data`` for ``url`` in the cache."""
-    global _paper_cache
-    path = _cache_file()
-    if path is None:
+    if _connection() is None:
+        return
+    with _lock:
+        _mark_dirty(url, dict(data), _stamps(data))
+
+
+def update_paper(
+    url: str, changes: dict[str, Any], *, default: dict[str, Any] | None = None
+) -> None:
+    """Merge ``changes`` into the cached record for ``url`` atomically.
+
+    ``default`` seeds the record when ``url`` is not cached yet.
+    """
+    conn = _connection()
+    if conn is None:
+        return
+    with _lock:
+        found = _get_locked(conn, url)
+        if found is None:
+            record = dict(default or {})
+            stamps = _stamps(record)
+        else:
+            record, stamps = found
+        record.update(changes)
+        stamps.update(_stamps(changes))
+        _mark_dirty(url, record, stamps)
+
+
+def set_negative(url: str, ttl: float | None = None) -> None:
+    """Remember that looking up ``url`` failed for ``ttl`` seconds.
+
+    ``ttl`` defaults to :data:`NEGATIVE_TTL`.
+    """
+    conn = _connection()
+    if conn is None:
+        return
+    expires = _now() + (NEGATIVE_TTL if ttl is None else ttl)
+    with _lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO negative (url, expires) VALUES (?, ?)",
+            (url, expires),
+        )
+
+
+def is_negative(url: str) -> bool:
+    """Return whether a lookup of ``url`` failed recently."""
+    conn = _connection()
+    if conn is None:
+        return False
+    with _lock:
+        row = conn.execute(
+            "SELECT expires FROM negative WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return False
+        if row[0] > _now():
+            return True
+        conn.execute("DELETE FROM negative WHERE url = ?", (url,))
+        return False
+
+
+def get_response(url: str) -> dict[str, Any] | None:
+    """Return the cached validators and parse result for ``url``.
+
+    The result has the keys ``validators`` and ``data`` or is ``None``.
+    """
+    conn = _connection()
+    if conn is None:
+        return None
+    with _lock:
+        row = conn.execute(
+            "SELECT validators, data FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"validators": loads(row[0]), "data": loads(row[1])}
+
+
+def set_response(url: str, validators: dict[str, str], data: Any) -> None:
+    """Store the HTTP ``validators`` and parse result ``data`` for ``url``."""
+    conn = _connection()
+    if conn is None:
         return
-    global _cache_path
-    if _paper_cache is None or _cache_path != path:
-        _paper_cache = _load_cache(path)
-        _cache_path = path
-    _paper_cache[url] = data
-    _save_cache(path, _paper_cache)
+    with _lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (url, validators, data) VALUES (?, ?, ?)",
+            (url, dumps(validators), dumps(data)),
+        )
@@ -0,0 +1,217 @@
+"""The ``newsletter`` command line interface.
+
+Each subcommand imports the subsystems it needs when it runs, so that quick
+commands such as ``newsletter cache stats`` start without loading the HTTP,
+HTML and NumPy libraries used by ``fetch``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Columns written by ``newsletter export --format csv``
+EXPORT_COLUMNS = ("arxiv_url", "title", "authors", "submission_date", "categories")
+# Keys of ``scoring.NORMALIZATIONS``, repeated so that parsing the command
+# line does not import NumPy
+NORMALIZATIONS = ("mean", "zscore", "rank", "none")
+
+
+def _weight(text: str) -> tuple[str, float]:
+    name, sep, value = text.partition("=")
+    try:
+        if not sep:
+            raise ValueError
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=WEIGHT, got {text!r}"
+        ) from None
+
+
+def fetch(args: argparse.Namespace) -> int:
+    """Download recent papers; arguments are those of :mod:`newsletter.pipeline`."""
+    from . import pipeline
+
+    pipeline.run(args.args)
+    return 0
+
+
+def score(args: argparse.Namespace) -> int:
+    """Rescore a papers file and write it back best first."""
+    from .paper import Paper
+    from .scoring import SIGNALS, score_papers
+    from .utils import dumps, loads
+
+    output = Path(args.output or args.file)
+    if output.exists() and not output.is_file():
+        # The output replaces the file, which would turn a device into one
+        print(f"Not a regular file: {output}", file=sys.stderr)
+        return 2
+    unknown = sorted({name for name, _ in args.weights or ()} - SIGNALS.keys())
+    if unknown:
+        print(
+            f"Unknown scoring signal {', '.join(unknown)};"
+            f" choose from {', '.join(SIGNALS)}",
+            file=sys.stderr,
+        )
+        return 2
+    with open(args.file, "r", encoding="utf-8") as fh:
+        papers = [Paper.from_dict(loads(line)) for line in fh if line.strip()]
+    weights = dict(args.weights) if args.weights else None
+    score_papers(papers, weights=weights, normalization=args.normalization)
+    papers.sort(key=lambda p: p.combined_score, reverse=True)
+    tmp = output.with_name(output.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        for paper in papers:
+            fh.write(dumps(paper.to_dict()))
+            fh.write("\n")
+    os.replace(tmp, output)
+    logger.info("Wrote %d papers to %s", len(papers), output)
+    return 0
+
+
+def export(args: argparse.Namespace) -> int:
+    """Write cached papers matching a query as JSON lines or CSV."""
+    from .query import find_papers
+    from .utils import dumps
+
+    papers = find_papers(
+        author=args.author,
+        since=args.since,
+        until=args.until,
+        keywords=args.keywords,
+        limit=args.limit,
+    )
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else None
+    fh = out or sys.stdout
+    try:
+        if args.format == "csv":
+            import csv
+
+            writer = csv.writer(fh)
+            writer.writerow(EXPORT_COLUMNS)
+            for paper in papers:
+                record = paper.to_dict()
+                writer.writerow(
+                    "; ".join(value) if isinstance(value, list) else value
+                    for value in (record[column] for column in EXPORT_COLUMNS)
+                )
+        else:
+            for paper in papers:
+                fh.write(dumps(paper.to_dict()))
+                fh.write("\n")
+    finally:
+        if out is not None:
+            out.close()
+    return 0
+
+
+def cache_stats(args: argparse.Namespace) -> int:
+    """Print the location, size and number of entries of the cache."""
+    from . import cache
+
+    stats = cache.stats()
+    if not stats:
+        print("Caching is disabled; set NEWSLETTER_CACHE_DIR", file=sys.stderr)
+        return 1
+    if args.json:
+        import json
+
+        print(json.dumps(stats, indent=2))
+    else:
+        for name, value in stats.items():
+            print(f"{name}: {value}")
+    return 0
+
+
+def bench(args: argparse.Namespace) -> int:
+    """Run the benchmark suite of a source checkout with pytest."""
+    directory = Path(__file__).resolve().parent.parent / "benchmarks"
+    if not directory.is_dir():
+        print("The benchmarks are only available in a source checkout", file=sys.stderr)
+        return 1
+    command = [sys.executable, "-m", "pytest", str(directory), *args.args]
+    return subprocess.call(command, cwd=directory.parent)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the parser of the ``newsletter`` command."""
+
+    parser = argparse.ArgumentParser(
+        prog="newsletter",
+        description="Download, score and inspect arXiv papers for the newsletter.",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log debug messages"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Options are passed on to newsletter.pipeline, including --help
+    sub = commands.add_parser(
+        "fetch", add_help=False, help="download and score recent papers"
+    )
+    sub.set_defaults(func=fetch)
+
+    sub = commands.add_parser("score", help="rescore a papers file")
+    sub.add_argument("file", help="JSON lines file written by fetch")
+    sub.add_argument("-o", "--output", help="write here instead of FILE")
+    sub.add_argument(
+        "--weight",
+        dest="weights",
+        action="append",
+        type=_weight,
+        metavar="NAME=WEIGHT",
+        help="weight of a scoring signal (repeatable, default: google=1)",
+    )
+    sub.add_argument(
+        "--normalization",
+        choices=NORMALIZATIONS,
+        help="normalization of every signal (default: mean)",
+    )
+    sub.set_defaults(func=score)
+
+    sub = commands.add_parser("export", help="export cached papers")
+    sub.add_argument("--author", help="papers with this author")
+    sub.add_argument(
+        "--since", type=date.fromisoformat, help="submitted on or after YYYY-MM-DD"
+    )
+    sub.add_argument(
+        "--until", type=date.fromisoformat, help="submitted on or before YYYY-MM-DD"
+    )
+    sub.add_argument("--keywords", help="words that must all occur in the title")
+    sub.add_argument("--limit", type=int, help="maximum number of papers")
+    sub.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    sub.add_argument("-o", "--output", help="output file (default: stdout)")
+    sub.set_defaults(func=export)
+
+    sub = commands.add_parser("cache", help="inspect the paper cache")
+    cache_commands = sub.add_subparsers(dest="cache_command", required=True)
+    stats = cache_commands.add_parser("stats", help="show cache size and counts")
+    stats.add_argument("--json", action="store_true", help="print JSON")
+    stats.set_defaults(func=cache_stats)
+
+    # Options are passed on to pytest
+    sub = commands.add_parser(
+        "bench", add_help=False, help="run the benchmark suite with pytest"
+    )
+    sub.set_defaults(func=bench)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the ``newsletter`` command and return its exit status."""
+
+    args, extra = build_parser().parse_known_args(argv)
+    if extra and args.func not in (fetch, bench):
+        build_parser().error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    return args.func(args)
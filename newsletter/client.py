@@ -0,0 +1,189 @@
+"""Shared HTTP client used for all outbound requests.
+
+A single :class:`requests.Session` with a sized connection pool, connection
+retries and gzip support is created lazily by :func:`get_session` so that consecutive
+requests to arXiv reuse keep-alive connections.  Callers and tests can pass
+their own session to :func:`get` or install one globally with
+:func:`set_session`.
+
+Requests are paced per host and retried on throttling responses by
+:mod:`newsletter.ratelimit`.
+
+:func:`conditional_headers` and :func:`validators` translate between cached
+``ETag``/``Last-Modified`` validators and conditional request headers.
+
+The asynchronous fetch path uses an :class:`httpx.AsyncClient` built by
+:func:`create_async_client`.  Async clients are bound to an event loop, so
+they are created per run rather than shared at module level.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import ratelimit
+
+# User agent to avoid being blocked by arXiv when running outside tests
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; newsletter/1.0)",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# Default request timeout in seconds
+TIMEOUT = 10
+# Maximum number of pooled connections kept per host
+POOL_SIZE = 32
+# Number of retries for connection errors; throttling and server error
+# responses are retried by :mod:`newsletter.ratelimit`
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+# Response header -> key under which its value is cached, and the request
+# header used to send it back.
+_VALIDATORS = (
+    ("ETag", "etag", "If-None-Match"),
+    ("Last-Modified", "last_modified", "If-Modified-Since"),
+)
+
+logger = logging.getLogger(__name__)
+
+_session: requests.Session | None = None
+
+
+def create_session(
+    *,
+    pool_size: int | None = None,
+    retries: int | None = None,
+    headers: dict[str, str] | None = None,
+) -> requests.Session:
+    """Return a new :class:`requests.Session` configured for pooled access."""
+
+    pool_size = POOL_SIZE if pool_size is None else pool_size
+    retries = RETRIES if retries is None else retries
+    retry = Retry(
+        total=retries,
+        status=0,
+        backoff_factor=BACKOFF_FACTOR,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS if headers is None else headers)
+    logger.debug("Created HTTP session (pool_size=%d, retries=%d)", pool_size, retries)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = create_session()
+    return _session
+
+
+def set_session(session: requests.Session | None) -> None:
+    """Install ``session`` as the shared session (``None`` resets it)."""
+    global _session
+    _session = session
+
+
+def get(
+    url: str,
+    *,
+    session: requests.Session | None = None,
+    timeout: float | None = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Issue a rate-limited GET request for ``url``.
+
+    The request goes through ``session`` or the shared session.
+    """
+    if session is None:
+        session = get_session()
+    timeout = TIMEOUT if timeout is None else timeout
+    return ratelimit.call(
+        _host(url), lambda: session.get(url, timeout=timeout, **kwargs)
+    )
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+def validators(response: requests.Response | httpx.Response) -> dict[str, str]:
+    """Return the cache validators (``etag``, ``last_modified``) of ``response``."""
+    found = {}
+    for header, key, _ in _VALIDATORS:
+        value = response.headers.get(header)
+        if value:
+            found[key] = value
+    return found
+
+
+def conditional_headers(cached: dict[str, Any] | None) -> dict[str, str]:
+    """Return conditional request headers for validators stored in ``cached``."""
+    headers = {}
+    for _, key, request_header in _VALIDATORS:
+        if cached and cached.get(key):
+            headers[request_header] = cached[key]
+    return headers
+
+
+def create_async_client(
+    *,
+    pool_size: int | None = None,
+    retries: int | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """Return a new :class:`httpx.AsyncClient` configured for pooled access.
+
+    ``transport`` replaces the network transport, e.g. with an
+    :class:`httpx.MockTransport` in tests.
+    """
+
+    pool_size = POOL_SIZE if pool_size is None else pool_size
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            retries=RETRIES if retries is None else retries,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+    return httpx.AsyncClient(
+        headers=HEADERS if headers is None else headers,
+        timeout=TIMEOUT if timeout is None else timeout,
+        transport=transport,
+        follow_redirects=True,
+    )
+
+
+async def aget(
+    url: str,
+    *,
+    http_client: httpx.AsyncClient | None = None,
+    timeout: float | None = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Issue a rate-limited asynchronous GET request for ``url``.
+
+    A temporary client is created when ``http_client`` is omitted.
+    """
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    if http_client is None:
+        async with create_async_client() as temporary:
+            return await aget(url, http_client=temporary, **kwargs)
+    return await ratelimit.acall(_host(url), lambda: http_client.get(url, **kwargs))
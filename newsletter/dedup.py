@@ -0,0 +1,194 @@
+"""Near-duplicate detection with MinHash signatures and LSH banding.
+
+The same work often reappears under a new arXiv identifier or as a close
+variant.  Every paper flushed to :mod:`newsletter.cache` gets a MinHash
+signature of the word shingles of its title and abstract, stored in the
+cache database.  Signatures are split into :data:`BANDS` bands whose hashes
+are indexed, so :func:`find_duplicate` only compares a paper with the few
+papers sharing a band instead of the whole corpus.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import zlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Iterable
+
+from . import cache
+from .utils import tokenize
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of hash functions in a signature; must be a multiple of BANDS
+NUM_PERM = 128
+# Number of LSH bands; more bands find less similar candidates
+BANDS = 32
+# Minimum estimated Jaccard similarity of two duplicates
+THRESHOLD = 0.8
+# Number of consecutive words in a shingle
+SHINGLE_SIZE = 3
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS dedup_signatures ("
+    "url TEXT PRIMARY KEY, signature BLOB NOT NULL, digest TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS dedup_bands ("
+    "band INTEGER NOT NULL, bucket BLOB NOT NULL, url TEXT NOT NULL,"
+    " PRIMARY KEY (band, bucket, url)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS dedup_bands_url ON dedup_bands (url)",
+)
+
+# Mersenne prime modulus of the universal hash functions
+_PRIME = (1 << 31) - 1
+# Multiplier combining the word hashes of a shingle
+_MIX = 1_000_003
+
+
+@lru_cache(maxsize=None)
+def _hash_functions() -> tuple["np.ndarray", "np.ndarray"]:
+    # NumPy is imported on first use so that opening the cache stays cheap;
+    # the fixed seed keeps signatures comparable across runs
+    import numpy as np
+
+    rng = np.random.default_rng(20240101)
+    return (
+        rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64),
+        rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64),
+    )
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    import numpy as np
+
+    # Hash each word once, then combine SHINGLE_SIZE consecutive hashes
+    tokens = np.fromiter(
+        (zlib.crc32(token.encode()) for token in tokenize(text)), np.uint64
+    )
+    if len(tokens) >= SHINGLE_SIZE:
+        hashes = np.zeros(len(tokens) - SHINGLE_SIZE + 1, np.uint64)
+        for offset in range(SHINGLE_SIZE):
+            hashes = (hashes * _MIX + tokens[offset : len(hashes) + offset]) % _PRIME
+        tokens = hashes
+    return np.unique(tokens % _PRIME)
+
+
+def signature(title: str, abstract: str = "") -> np.ndarray | None:
+    """Return the MinHash signature of a paper or ``None`` without any words.
+
+    The signature is computed over the hashes of word shingles of
+    :data:`SHINGLE_SIZE` words.
+    """
+
+    hashes = _shingle_hashes(f"{title} {abstract}")
+    if not len(hashes):
+        return None
+    import numpy as np
+
+    a, b = _hash_functions()
+    values = (np.outer(a, hashes) + b[:, None]) % _PRIME
+    return values.min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return float((a == b).sum()) / len(a)
+
+
+def _buckets(sig: np.ndarray) -> list[tuple[int, bytes]]:
+    return [
+        (band, hashlib.blake2b(rows.tobytes(), digest_size=8).digest())
+        for band, rows in enumerate(sig.reshape(BANDS, -1))
+    ]
+
+
+def index_records(
+    conn: sqlite3.Connection, records: Iterable[tuple[str, dict[str, Any]]]
+) -> int:
+    """Store signatures of ``(url, record)`` pairs whose text changed.
+
+    Records whose title and abstract match the digest stored with their
+    signature are skipped without hashing.  Must be called inside a
+    transaction on the cache connection ``conn``.  Returns the number of
+    signatures written.
+    """
+
+    count = 0
+    for url, record in records:
+        title, abstract = record.get("title", ""), record.get("abstract", "")
+        text = f"{title} {abstract}"
+        digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        row = conn.execute(
+            "SELECT digest FROM dedup_signatures WHERE url = ?", (url,)
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            continue
+        remove_urls(conn, [url])
+        sig = signature(title, abstract)
+        if sig is None:
+            continue
+        conn.execute(
+            "INSERT INTO dedup_signatures VALUES (?, ?, ?)",
+            (url, sig.tobytes(), digest),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO dedup_bands VALUES (?, ?, ?)",
+            ((band, bucket, url) for band, bucket in _buckets(sig)),
+        )
+        count += 1
+    return count
+
+
+def remove_urls(conn: sqlite3.Connection, urls: Iterable[str]) -> None:
+    """Drop the signatures of ``urls``; must run inside a cache transaction."""
+    for url in urls:
+        conn.execute("DELETE FROM dedup_bands WHERE url = ?", (url,))
+        conn.execute("DELETE FROM dedup_signatures WHERE url = ?", (url,))
+
+
+def find_duplicate(
+    title: str,
+    abstract: str = "",
+    *,
+    exclude: str | None = None,
+    threshold: float = THRESHOLD,
+) -> str | None:
+    """Return the URL of the cached paper most similar to the given text.
+
+    Only papers whose estimated Jaccard similarity reaches ``threshold`` are
+    considered, and the paper ``exclude`` itself is skipped.  Like
+    :func:`newsletter.fulltext.related_density` this looks at flushed
+    records only.
+    """
+
+    import numpy as np
+
+    conn = cache._connection()
+    sig = signature(title, abstract)
+    if conn is None or sig is None:
+        return None
+    best, best_score = None, 0.0
+    with cache._lock:
+        candidates = {
+            url
+            for band, bucket in _buckets(sig)
+            for (url,) in conn.execute(
+                "SELECT url FROM dedup_bands WHERE band = ? AND bucket = ?",
+                (band, bucket),
+            )
+        }
+        candidates.discard(exclude)
+        for url in sorted(candidates):
+            (blob,) = conn.execute(
+                "SELECT signature FROM dedup_signatures WHERE url = ?", (url,)
+            ).fetchone()
+            score = similarity(sig, np.frombuffer(blob, dtype=np.uint32))
+            if score >= threshold and score > best_score:
+                best, best_score = url, score
+    if best is not None:
+        logger.debug("%r duplicates %s (similarity %.2f)", title, best, best_score)
+    return best
@@ -0,0 +1,213 @@
+"""Local BM25 full-text index over the titles and abstracts of cached papers.
+
+The inverted index lives in the cache database next to the papers and is
+updated whenever :mod:`newsletter.cache` flushes new or changed records, so
+it always covers the cached corpus.  :func:`search`
+ranks papers for a keyword query and :func:`related_density` measures how
+much closely related work the corpus holds for a paper, an offline scoring
+signal that needs no network access.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import sqlite3
+from collections import Counter
+from typing import Any, Iterable
+
+from . import cache
+from .utils import loads, tokenize
+
+logger = logging.getLogger(__name__)
+
+# BM25 term frequency saturation and document length normalisation
+K1 = 1.2
+B = 0.75
+# Number of related papers averaged by :func:`related_density`
+RELATED_K = 10
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS fulltext_docs ("
+    "url TEXT PRIMARY KEY, length INTEGER NOT NULL, digest TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS fulltext_terms ("
+    "term TEXT PRIMARY KEY, df INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS fulltext_postings ("
+    "term TEXT NOT NULL, url TEXT NOT NULL, tf INTEGER NOT NULL,"
+    " PRIMARY KEY (term, url)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS fulltext_postings_url ON fulltext_postings (url)",
+    "CREATE TABLE IF NOT EXISTS fulltext_stats ("
+    "id INTEGER PRIMARY KEY CHECK (id = 0), docs INTEGER NOT NULL,"
+    " length INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO fulltext_stats VALUES (0, 0, 0)",
+)
+
+
+def _document(record: dict[str, Any]) -> str:
+    return f"{record.get('title', '')} {record.get('abstract', '')}"
+
+
+class _Delta:
+    """Changes to document frequencies and corpus statistics, written once."""
+
+    def __init__(self) -> None:
+        self.df: Counter[str] = Counter()
+        self.docs = 0
+        self.length = 0
+
+    def write(self, conn: sqlite3.Connection) -> None:
+        conn.executemany(
+            "INSERT INTO fulltext_terms VALUES (?, ?)"
+            " ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+            ((term, df) for term, df in self.df.items() if df),
+        )
+        conn.execute(
+            "UPDATE fulltext_stats SET docs = docs + ?, length = length + ?"
+            " WHERE id = 0",
+            (self.docs, self.length),
+        )
+
+
+def _remove(conn: sqlite3.Connection, url: str, delta: _Delta) -> None:
+    row = conn.execute(
+        "SELECT length FROM fulltext_docs WHERE url = ?", (url,)
+    ).fetchone()
+    if row is None:
+        return
+    for (term,) in conn.execute(
+        "SELECT term FROM fulltext_postings WHERE url = ?", (url,)
+    ):
+        delta.df[term] -= 1
+    conn.execute("DELETE FROM fulltext_postings WHERE url = ?", (url,))
+    conn.execute("DELETE FROM fulltext_docs WHERE url = ?", (url,))
+    delta.docs -= 1
+    delta.length -= row[0]
+
+
+def index_records(
+    conn: sqlite3.Connection, records: Iterable[tuple[str, dict[str, Any]]]
+) -> int:
+    """Index ``(url, record)`` pairs whose title or abstract changed.
+
+    Must be called inside a transaction on the cache database ``conn``.
+    Document frequencies and corpus statistics are updated once per call.
+    Returns the number of documents (re)indexed.
+    """
+
+    count = 0
+    delta = _Delta()
+    for url, record in records:
+        text = _document(record)
+        digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        row = conn.execute(
+            "SELECT digest FROM fulltext_docs WHERE url = ?", (url,)
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            continue
+        _remove(conn, url, delta)
+        terms = Counter(tokenize(text))
+        if not terms:
+            continue
+        length = sum(terms.values())
+        conn.execute(
+            "INSERT INTO fulltext_docs VALUES (?, ?, ?)", (url, length, digest)
+        )
+        conn.executemany(
+            "INSERT INTO fulltext_postings VALUES (?, ?, ?)",
+            ((term, url, tf) for term, tf in terms.items()),
+        )
+        delta.df.update(terms.keys())
+        delta.docs += 1
+        delta.length += length
+        count += 1
+    delta.write(conn)
+    return count
+
+
+def remove_urls(conn: sqlite3.Connection, urls: Iterable[str]) -> None:
+    """Drop ``urls`` from the index; must run inside a cache transaction."""
+    delta = _Delta()
+    for url in urls:
+        _remove(conn, url, delta)
+    delta.write(conn)
+
+
+def rebuild() -> int:
+    """Index the cached papers that are not indexed yet.
+
+    Every cached paper is queued for the index thread of
+    :mod:`newsletter.cache`, like a flushed record, and unchanged papers are
+    skipped there.  Returns the number of cached papers once they are indexed.
+    """
+    cache.flush()
+    conn = cache._connection()
+    if conn is None:
+        return 0
+    with cache._lock:
+        records = [
+            (url, loads(data))
+            for url, data in conn.execute("SELECT url, data FROM papers")
+        ]
+        cache._queue_index(cache._conn_path, records, [])
+    cache._index_queue.join()
+    logger.info("Checked the index of %d cached papers", len(records))
+    return len(records)
+
+
+def _bm25(conn: sqlite3.Connection, terms: Counter[str]) -> dict[str, float]:
+    docs, total = conn.execute(
+        "SELECT docs, length FROM fulltext_stats WHERE id = 0"
+    ).fetchone()
+    if not docs or not terms:
+        return {}
+    average = total / docs
+    scores: dict[str, float] = {}
+    for term, weight in terms.items():
+        row = conn.execute(
+            "SELECT df FROM fulltext_terms WHERE term = ?", (term,)
+        ).fetchone()
+        if row is None or row[0] <= 0:
+            continue
+        idf = math.log(1 + (docs - row[0] + 0.5) / (row[0] + 0.5))
+        postings = conn.execute(
+            "SELECT p.url, p.tf, d.length FROM fulltext_postings p"
+            " JOIN fulltext_docs d ON d.url = p.url WHERE p.term = ?",
+            (term,),
+        )
+        for url, tf, length in postings:
+            norm = tf + K1 * (1 - B + B * length / average)
+            scores[url] = scores.get(url, 0.0) + weight * idf * tf * (K1 + 1) / norm
+    return scores
+
+
+def search(query: str, limit: int = 10) -> list[tuple[str, float]]:
+    """Return up to ``limit`` ``(url, score)`` pairs best matching ``query``."""
+    conn = cache._connection()
+    if conn is None:
+        return []
+    cache.flush()
+    with cache._lock:
+        scores = _bm25(conn, Counter(tokenize(query)))
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def related_density(
+    query: str, *, exclude: str | None = None, k: int = RELATED_K
+) -> float:
+    """Return the mean BM25 score of the ``k`` papers most related to ``query``.
+
+    ``query`` is normally a paper's title and ``exclude`` its URL, so the
+    paper itself is left out.  Papers in a crowded area of the corpus score
+    higher.  Unlike :func:`search` pending cache writes are not flushed
+    first, so that scoring many papers stays cheap.
+    """
+
+    conn = cache._connection()
+    if conn is None:
+        return 0.0
+    with cache._lock:
+        scores = _bm25(conn, Counter(tokenize(query)))
+    scores.pop(exclude, None)
+    top = sorted(scores.values(), reverse=True)[:k]
+    return sum(top) / k if top else 0.0
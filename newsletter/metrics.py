@@ -0,0 +1,176 @@
+"""Counters, histograms and timers describing a run.
+
+The fetch pipeline records how often things happen with :func:`increment` and
+how long each stage takes with :func:`timer`.  At the end of a run
+:func:`write_json` stores a summary and :func:`write_prometheus` a textfile
+for the Prometheus node exporter.  Metrics are process-wide; :func:`reset`
+clears them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Prefix of metric names in the Prometheus textfile
+PROMETHEUS_PREFIX = "newsletter_"
+# Ratio name -> (hits, misses) counters it is computed from
+RATIOS = {"cache_hit_rate": ("cache_hits", "cache_misses")}
+
+
+class Histogram:
+    """Distribution of observed values with cumulative bucket counts."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else 0.0,
+        }
+
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_histograms: dict[str, Histogram] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Add ``value`` to the counter ``name``."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Record ``value`` in the histogram ``name``."""
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram()
+        _histograms[name].observe(value)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Record the duration of the ``with`` block in the histogram ``name``.
+
+    Failed blocks are timed as well.  Inside coroutines the time spent
+    waiting in ``await`` counts towards the duration.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def reset() -> None:
+    """Clear all metrics."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot() -> dict[str, Any]:
+    """Return the current counters, histogram summaries and ratios."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {name: h.summary() for name, h in _histograms.items()}
+    ratios = {}
+    for name, (hits, misses) in RATIOS.items():
+        total = counters.get(hits, 0) + counters.get(misses, 0)
+        if total:
+            ratios[name] = counters.get(hits, 0) / total
+    return {"counters": counters, "histograms": histograms, "ratios": ratios}
+
+
+def _write_atomic(path: str | os.PathLike, text: str) -> None:
+    # Readers such as the node exporter must never see a partial file
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_json(path: str | os.PathLike) -> None:
+    """Write :func:`snapshot` to ``path`` as JSON."""
+    _write_atomic(path, json.dumps(snapshot(), indent=2, sort_keys=True) + "\n")
+    logger.debug("Wrote metrics to %s", path)
+
+
+def prometheus_text() -> str:
+    """Return the metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            (name, h.count, h.sum, list(h.buckets)) for name, h in _histograms.items()
+        )
+    for name, value in counters:
+        metric = f"{PROMETHEUS_PREFIX}{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    for name, count, total, buckets in histograms:
+        metric = f"{PROMETHEUS_PREFIX}{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, bucket in zip(BUCKETS, buckets):
+            lines.append(f'{metric}_bucket{{le="{bound:g}"}} {bucket}')
+        lines += [
+            f'{metric}_bucket{{le="+Inf"}} {count}',
+            f"{metric}_sum {total:g}",
+            f"{metric}_count {count}",
+        ]
+    for name, value in snapshot()["ratios"].items():
+        metric = f"{PROMETHEUS_PREFIX}{name}"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str | os.PathLike) -> None:
+    """Write :func:`prometheus_text` to the textfile ``path``."""
+    _write_atomic(path, prometheus_text())
+    logger.debug("Wrote Prometheus metrics to %s", path)
+
+
+def log_report() -> None:
+    """Log the time spent in each stage, slowest first."""
+    summary = snapshot()
+    stages = sorted(
+        summary["histograms"].items(), key=lambda item: item[1]["sum"], reverse=True
+    )
+    for name, stats in stages:
+        logger.info(
+            "%s: %d calls, %.2fs total, %.3fs mean, %.3fs max",
+            name,
+            stats["count"],
+            stats["sum"],
+            stats["mean"],
+            stats["max"],
+        )
+    for name, value in summary["ratios"].items():
+        logger.info("%s: %.1f%%", name, 100 * value)
@@ -2,26 +2,107 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field, asdict
+import sys
+from dataclasses import dataclass, field
 from datetime import date
-from html import unescape
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Optional
 
 import logging
-import requests
-from bs4 import BeautifulSoup
-from . import cache
+from . import archive, cache, metrics, ratelimit
 
-from .utils import extract_meta
+from .utils import parse_citation_meta, soup_citation_meta
 
+# The HTTP, HTML and scoring modules are imported by the methods that need
+# them, so that loading and writing papers stays cheap for the CLI
+if TYPE_CHECKING:
+    import httpx
+    import requests
 
-from googlesearch import search as google_search
-from requests.exceptions import HTTPError
+    from .parsing import ParserPool
 
 logger = logging.getLogger(__name__)
 
+# Host queried by ``googlesearch``; used to pace searches
+GOOGLE_HOST = "www.google.com"
+# Statuses of abs pages that are remembered as failed lookups
+NEGATIVE_STATUSES = (404, 410)
 
-@dataclass
+
+def google_search(query: str, **kwargs: Any) -> Iterator[str]:
+    """Return the result URLs of :func:`googlesearch.search` for ``query``."""
+    from googlesearch import search
+
+    return search(query, **kwargs)
+
+
+def _parse_date(value: str) -> date:
+    """Parse a ``YYYY-MM-DD`` or ``YYYY/MM/DD`` date, defaulting to today."""
+    try:
+        return date.fromisoformat(value.replace("/", "-"))
+    except ValueError:
+        return date.today()
+
+
+def _check_negative(url: str, cached: Optional[dict]) -> None:
+    """Raise :class:`LookupError` if ``url`` is uncached and failed recently."""
+    if not cached and cache.is_negative(url):
+        metrics.increment("negative_hits")
+        raise LookupError(f"{url} was not found recently; not retrying yet")
+
+
+def _remember_failure(url: str, status: int) -> None:
+    if status in NEGATIVE_STATUSES:
+        logger.info("%s returned %d; remembering the failed lookup", url, status)
+        cache.set_negative(url)
+
+
+def parse_abs_page(html: str) -> dict[str, Any]:
+    """Return the :class:`Paper` fields described by the abs page ``html``."""
+    fields, fallback = _parse_abs_page(html)
+    if fallback:
+        metrics.increment("abs_parse_fallbacks")
+    return fields
+
+
+def _parse_abs_page(html: str) -> tuple[dict[str, Any], bool]:
+    """Return the fields of ``html`` and whether the fallback parser ran.
+
+    This is a pure function of ``html`` so that it can run in worker
+    processes (see :mod:`newsletter.parsing`), whose metrics would be lost.
+    """
+
+    meta = parse_citation_meta(html)
+    fallback = "citation_title" not in meta
+    if fallback:
+        logger.debug("No citation meta tags in page head; using fallback")
+        meta = soup_citation_meta(html)
+
+    # Title
+    title = meta.get("citation_title", [""])[0]
+    logger.debug("Parsed title: %s", title)
+
+    # Abstract
+    abstract = meta.get("citation_abstract", [""])[0]
+
+    # Authors can appear multiple times.
+    authors = meta.get("citation_author", [])
+    logger.debug("Parsed %d authors", len(authors))
+
+    # Submission date in format YYYY/MM/DD
+    date_str = meta.get("citation_date", ["1970/01/01"])[0]
+    submission_date = _parse_date(date_str)
+    logger.debug("Parsed submission date: %s", submission_date)
+
+    fields = {
+        "title": title,
+        "abstract": abstract,
+        "authors": authors,
+        "submission_date": submission_date,
+    }
+    return fields, fallback
+
+
+@dataclass(slots=True)
 class Paper:
     """Metadata for an arXiv paper.
 
@@ -37,9 +118,12 @@ class Paper:
         List of author names.
     submission_date : date
         Date the paper was submitted.
+    categories : List[str]
+        arXiv listing categories the paper was found in.
 
     Instances are typically created via :meth:`from_url` which scrapes these
-    fields from an arXiv HTML page.
+    fields from an arXiv HTML page.  The class uses ``__slots__`` and author
+    names and categories are interned, since many papers share them.
     """
 
     arxiv_url: str
@@ -48,77 +132,266 @@ class Paper:
     authors: List[str]
     submission_date: date
     google_results: Optional[List[str]] = field(default=None)
+    categories: List[str] = field(default_factory=list)
     combined_score: float = field(default=0.0, init=False)
 
+    def __post_init__(self) -> None:
+        self.authors = [sys.intern(name) for name in self.authors]
+        self.categories = [sys.intern(name) for name in self.categories]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serialisable dictionary of the paper's fields.
+
+        Unlike :func:`dataclasses.asdict` the lists are not copied, so the
+        result must not be modified in place.
+        """
+
+        return {
+            "arxiv_url": self.arxiv_url,
+            "title": self.title,
+            "abstract": self.abstract,
+            "authors": self.authors,
+            "submission_date": self.submission_date.isoformat(),
+            "google_results": self.google_results,
+            "categories": self.categories,
+            "combined_score": self.combined_score,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Paper":
+        """Build a :class:`Paper` from :meth:`to_dict` output.
+
+        ``combined_score`` and unknown keys are ignored.
+        """
+
+        return cls._from_record(data["arxiv_url"], data)
+
+    @classmethod
+    def _from_record(cls, url: str, record: dict) -> "Paper":
+        """Build a :class:`Paper` from a cache record."""
+
+        return cls(
+            arxiv_url=url,
+            title=record.get("title", ""),
+            abstract=record.get("abstract", ""),
+            authors=record.get("authors", []),
+            submission_date=date.fromisoformat(record["submission_date"]),
+            google_results=record.get("google_results"),
+            categories=record.get("categories", []),
+        )
+
     @classmethod
-    def from_url(cls, url: str) -> "Paper":
+    def _from_cache(cls, url: str) -> Optional["Paper"]:
+        """Return the cached :class:`Paper` for ``url`` or ``None``."""
+
+        cached = cache.get_paper(url)
+        if not cached:
+            return None
+        return cls._from_record(url, cached)
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        *,
+        session: Optional[requests.Session] = None,
+        refresh: bool = False,
+        reparse: bool = False,
+    ) -> "Paper":
         """Fetch paper metadata from the given URL and return a :class:`Paper`.
 
         The function downloads the HTML from the arXiv ``abs`` page and
         extracts information from the ``citation_*`` meta tags which are
         consistently provided on arXiv pages.  Only a very small subset of
         fields are parsed (title, authors, abstract and submission date) as
-        required by the :class:`Paper` dataclass.
+        required by the :class:`Paper` dataclass.  ``session`` overrides the
+        shared HTTP session from :mod:`newsletter.client`.
+
+        Cached papers are returned without network access unless ``refresh``
+        is set, in which case the page is revalidated with a conditional
+        request using the ``ETag``/``Last-Modified`` validators stored in the
+        cache and only reparsed if it changed.
+
+        Pages that were not found are remembered for
+        :data:`newsletter.cache.NEGATIVE_TTL` seconds and raise
+        :class:`LookupError` until then without a request.
+
+        Fetched pages are kept in :mod:`newsletter.archive` when it is
+        enabled.  With ``reparse`` an archived page is parsed again without
+        network access instead of using the cache.
         """
 
+        from . import client
+
+        if reparse:
+            html = archive.load(url)
+            if html is not None:
+                return cls.from_html(url, html)
         cached = cache.get_paper(url)
-        if cached:
-            return cls(
-                arxiv_url=url,
-                title=cached.get("title", ""),
-                abstract=cached.get("abstract", ""),
-                authors=cached.get("authors", []),
-                submission_date=date.fromisoformat(cached["submission_date"]),
-                google_results=cached.get("google_results"),
-            )
+        if cached and not refresh:
+            return cls._from_record(url, cached)
+        _check_negative(url, cached)
 
-        # Retrieve the page content.  Tests patch ``requests.get`` to avoid
+        # Retrieve the page content.  Tests inject a mock session to avoid
         # network access during unit tests.
         logger.info("Fetching %s", url)
-        resp = requests.get(url, timeout=10)
+        with metrics.timer("abs_fetch_seconds"):
+            resp = client.get(
+                url, session=session, headers=client.conditional_headers(cached)
+            )
+        if resp.status_code == 304 and cached:
+            logger.debug("%s not modified", url)
+            metrics.increment("abs_not_modified")
+            return cls._from_record(url, cached)
+        _remember_failure(url, resp.status_code)
         resp.raise_for_status()
-        html = resp.text
-        soup = BeautifulSoup(html, "html.parser")
         logger.debug(
             "Received response (status %s) with %d characters",
             getattr(resp, "status_code", "unknown"),
-            len(html),
+            len(resp.text),
         )
+        archive.store(url, resp.text)
+        return cls.from_html(url, resp.text, validators=client.validators(resp))
 
-        # Title
-        title = extract_meta(soup, "citation_title") or ""
-        logger.debug("Parsed title: %s", title)
-
-        # Abstract
-        abstract = extract_meta(soup, "citation_abstract") or ""
+    @classmethod
+    async def afrom_url(
+        cls,
+        url: str,
+        *,
+        http_client: Optional[httpx.AsyncClient] = None,
+        refresh: bool = False,
+        parser: Optional["ParserPool"] = None,
+    ) -> "Paper":
+        """Asynchronous counterpart of :meth:`from_url`.
+
+        ``http_client`` is an :class:`httpx.AsyncClient`, normally created
+        once per run with :func:`newsletter.client.create_async_client`; a
+        temporary client is used when it is omitted.  Pages are parsed by
+        the worker processes of ``parser`` if given and in the event loop
+        otherwise.
+        """
 
-        # Authors can appear multiple times.
-        authors = [
-            unescape(tag["content"])
-            for tag in soup.find_all("meta", attrs={"name": "citation_author"})
-            if tag.has_attr("content")
-        ]
-        logger.debug("Parsed %d authors", len(authors))
+        from . import client
 
-        # Submission date in format YYYY/MM/DD
-        date_str = extract_meta(soup, "citation_date") or "1970/01/01"
-        try:
-            submission_date = date.fromisoformat(date_str.replace("/", "-"))
-        except ValueError:
-            submission_date = date.today()
-        logger.debug("Parsed submission date: %s", submission_date)
+        cached = cache.get_paper(url)
+        if cached and not refresh:
+            return cls._from_record(url, cached)
+        _check_negative(url, cached)
 
-        paper = cls(
-            arxiv_url=url,
-            title=title,
-            abstract=abstract,
-            authors=authors,
-            submission_date=submission_date,
+        logger.info("Fetching %s", url)
+        with metrics.timer("abs_fetch_seconds"):
+            resp = await client.aget(
+                url,
+                http_client=http_client,
+                headers=client.conditional_headers(cached),
+            )
+        if resp.status_code == 304 and cached:
+            logger.debug("%s not modified", url)
+            metrics.increment("abs_not_modified")
+            return cls._from_record(url, cached)
+        _remember_failure(url, resp.status_code)
+        resp.raise_for_status()
+        logger.debug(
+            "Received response (status %s) with %d characters",
+            resp.status_code,
+            len(resp.text),
         )
-        data = asdict(paper)
-        if isinstance(data.get("submission_date"), date):
-            data["submission_date"] = data["submission_date"].isoformat()
-        cache.set_paper(url, data)
+        archive.store(url, resp.text)
+        if parser is None:
+            return cls.from_html(url, resp.text, validators=client.validators(resp))
+        fields = await parser.parse(resp.text)
+        return cls.from_fields(url, fields, validators=client.validators(resp))
+
+    @classmethod
+    def from_ids(
+        cls,
+        ids: Iterable[str],
+        *,
+        batch_size: Optional[int] = None,
+        session: Optional[requests.Session] = None,
+        refresh: bool = False,
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+    ) -> List["Paper"]:
+        """Return papers for many arXiv identifiers using batched API queries.
+
+        ``ids`` may be identifiers or ``abs`` URLs.  Cached papers are reused
+        unless ``refresh`` is set, the others are requested from the arXiv
+        export API ``batch_size`` (default :data:`newsletter.arxiv.BATCH_SIZE`)
+        at a time and stored in the cache, and papers missing from the API
+        response fall back to :meth:`from_url`.  Papers are returned in the
+        order of ``ids``.
+
+        If ``on_error`` is given, a URL whose fallback raises is passed to it
+        together with the exception and left out of the result; otherwise
+        the exception propagates.
+        """
+
+        from . import arxiv
+
+        if batch_size is None:
+            batch_size = arxiv.BATCH_SIZE
+        urls = [arxiv.abs_url(ident) for ident in ids]
+        papers: dict[str, Paper] = {}
+        missing: dict[str, List[str]] = {}
+        for url in urls:
+            cached = None if refresh else cls._from_cache(url)
+            if cached:
+                papers[url] = cached
+            else:
+                missing.setdefault(arxiv.arxiv_id(url), []).append(url)
+        logger.info("%d of %d papers cached", len(papers), len(urls))
+
+        records = arxiv.fetch_metadata(missing, batch_size=batch_size, session=session)
+        for record in records:
+            fields = {
+                "title": record["title"],
+                "abstract": record["abstract"],
+                "authors": record["authors"],
+                "submission_date": _parse_date(record["submission_date"]),
+            }
+            for url in missing.pop(record["id"], []):
+                papers[url] = cls.from_fields(url, fields)
+
+        for group in missing.values():
+            for url in group:
+                logger.info("No export API record for %s; fetching abs page", url)
+                try:
+                    papers[url] = cls.from_url(url, session=session, refresh=refresh)
+                except Exception as exc:
+                    if on_error is None:
+                        raise
+                    on_error(url, exc)
+        return [papers[url] for url in urls if url in papers]
+
+    @classmethod
+    def from_html(
+        cls, url: str, html: str, *, validators: Optional[dict] = None
+    ) -> "Paper":
+        """Parse the ``abs`` page ``html`` of ``url`` and cache the result.
+
+        ``validators`` are the HTTP cache validators of the response and are
+        stored next to the parsed fields.  Fields already cached for ``url``,
+        such as search results, are kept.
+        """
+
+        with metrics.timer("abs_parse_seconds"):
+            fields = parse_abs_page(html)
+        return cls.from_fields(url, fields, validators=validators)
+
+    @classmethod
+    def from_fields(
+        cls, url: str, fields: dict[str, Any], *, validators: Optional[dict] = None
+    ) -> "Paper":
+        """Build the paper for ``url`` from :func:`parse_abs_page` output.
+
+        The fields are cached as in :meth:`from_html`.
+        """
+
+        paper = cls(arxiv_url=url, **fields)
+        record = paper.to_dict()
+        # Search results and categories come from elsewhere; keep cached ones
+        del record["google_results"], record["categories"]
+        cache.update_paper(url, {**record, **(validators or {})})
         return paper
 
     # ------------------------------------------------------------------
@@ -126,28 +399,42 @@ class Paper:
     # ------------------------------------------------------------------
 
     def query_google(self, num_results: int = 10) -> List[str]:
-        """Search Google for the paper title or URL and store the results."""
+        """Search Google for the paper title or URL and store the results.
+
+        Searches are paced and retried by :mod:`newsletter.ratelimit`.  If the
+        search still fails an empty list is returned and nothing is stored.
+        """
 
         query = f'"{self.title}" OR "{self.arxiv_url}"'
         cached = cache.get_paper(self.arxiv_url)
         if cached and cached.get("google_results") is not None:
             self.google_results = cached["google_results"]
+            metrics.increment("google_cached")
             return self.google_results
 
+        from requests.exceptions import HTTPError
+
         logger.info("Searching Google for '%s'", self.title)
         try:
             # ``google_search`` returns an iterator over result URLs
-            results = list(google_search(query, num_results=num_results))
+            with metrics.timer("google_query_seconds"):
+                results = ratelimit.call(
+                    GOOGLE_HOST,
+                    lambda: list(google_search(query, num_results=num_results)),
+                )
         except HTTPError as exc:
+            metrics.increment("google_failures")
+            # A failed search is not an answer: leave ``google_results`` unset
+            # and keep it out of the cache so the next run searches again.
             logger.warning("Google search failed for %s: %s", self.title, exc)
-            results = []
+            return []
         self.google_results = results
         logger.debug("Found %d Google results", len(results))
-        data = cached or asdict(self)
-        if isinstance(data.get("submission_date"), date):
-            data["submission_date"] = data["submission_date"].isoformat()
-        data["google_results"] = self.google_results
-        cache.set_paper(self.arxiv_url, data)
+        cache.update_paper(
+            self.arxiv_url,
+            {"google_results": self.google_results},
+            default=self.to_dict(),
+        )
         return results
 
     def search_result_counts(self) -> dict[str, int]:
@@ -176,20 +463,20 @@ class Paper:
         return score
 
     @classmethod
-    def compute_scores(cls, papers: List["Paper"]) -> None:
-        """Compute search scores for all given papers."""
-
-        if not papers:
-            return
-
-        total_google = sum(p.search_result_counts()["google"] for p in papers)
-        mean_google = total_google / len(papers) if papers else 0
+    def compute_scores(
+        cls,
+        papers: List["Paper"],
+        *,
+        weights: Optional[dict[str, float]] = None,
+        normalization: Optional[str | dict[str, str]] = None,
+    ) -> None:
+        """Compute search scores for all given papers.
+
+        Scoring is delegated to :func:`newsletter.scoring.score_papers`;
+        ``weights`` and ``normalization`` select its signals and how they are
+        normalised.  The default is the Google hit count divided by its mean.
+        """
 
-        logger.info(
-            "Computing scores for %d papers (mean_google=%.3f)",
-            len(papers),
-            mean_google,
-        )
+        from .scoring import score_papers
 
-        for p in papers:
-            p.compute_score(mean_google)
+        score_papers(papers, weights=weights, normalization=normalization)
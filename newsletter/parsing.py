@@ -0,0 +1,227 @@
+"""Parse abs pages in worker processes.
+
+HTML parsing is CPU bound and holds the GIL, so parsing pages on the threads
+or event loop that wait on the network limits a run to one core.
+:class:`ParserPool` hands the raw HTML to a :class:`ProcessPoolExecutor`
+instead.  Pages are grouped into batches of :data:`BATCH_SIZE` to amortise
+pickling; a partial batch is submitted after :data:`MAX_DELAY` seconds.
+
+:func:`reparse_archive` parses every page of :mod:`newsletter.archive` again
+in the same way and updates the cache, without network access.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Iterator
+
+from . import archive, cache, metrics
+from .paper import Paper, _parse_abs_page
+
+logger = logging.getLogger(__name__)
+
+# Number of pages sent to a worker at once
+BATCH_SIZE = 16
+# Seconds to wait for a batch to fill before submitting it anyway
+MAX_DELAY = 0.01
+
+# Fields of a page, seconds its parsing took and whether the fallback parser
+# ran, or the exception parsing it raised
+Parsed = tuple[dict[str, Any], float, bool] | Exception
+
+
+def parse_abs_pages(pages: list[str]) -> list[Parsed]:
+    """Parse ``pages`` and return the :data:`Parsed` result of each.
+
+    A page that cannot be parsed yields its exception, so that it does not
+    fail the other pages of the batch.
+    """
+
+    results: list[Parsed] = []
+    for html in pages:
+        start = time.perf_counter()
+        try:
+            fields, fallback = _parse_abs_page(html)
+        except Exception as exc:
+            results.append(exc)
+            continue
+        results.append((fields, time.perf_counter() - start, fallback))
+    return results
+
+
+def _record_metrics(seconds: float, fallback: bool) -> None:
+    # Worker processes cannot update the metrics of this one
+    metrics.observe("abs_parse_seconds", seconds)
+    if fallback:
+        metrics.increment("abs_parse_fallbacks")
+
+
+class ParserPool:
+    """Batching front end to a pool of parser processes.
+
+    Use as a context manager inside the event loop that awaits :meth:`parse`.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        batch_size: int = BATCH_SIZE,
+        max_delay: float = MAX_DELAY,
+    ) -> None:
+        # Workers are spawned rather than forked since the parent runs threads
+        self._executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._batch: list[tuple[str, asyncio.Future]] = []
+        self._handle: asyncio.TimerHandle | None = None
+
+    async def parse(self, html: str) -> dict[str, Any]:
+        """Return :func:`~newsletter.paper.parse_abs_page` of ``html``."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((html, future))
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+        elif self._handle is None:
+            self._handle = loop.call_later(self.max_delay, self._submit)
+        return await future
+
+    def _submit(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        logger.debug("Submitting %d pages to the parser pool", len(batch))
+        submitted = self._executor.submit(parse_abs_pages, [html for html, _ in batch])
+
+        def finished(done: Future) -> None:
+            # Runs in a pool thread; results are handed over in the loop
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, batch, done)
+
+        submitted.add_done_callback(finished)
+
+    def close(self) -> None:
+        """Fail pending pages and shut the worker processes down."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for _, future in self._batch:
+            future.cancel()
+        self._batch = []
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "ParserPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _resolve(batch: list[tuple[str, asyncio.Future]], done: Future) -> None:
+    """Hand the results of a finished batch to the waiting coroutines."""
+    if done.cancelled():
+        for _, future in batch:
+            future.cancel()
+        return
+    error = done.exception()
+    for i, (_, future) in enumerate(batch):
+        if future.done():
+            continue
+        if error is not None:
+            future.set_exception(error)
+            continue
+        result = done.result()[i]
+        if isinstance(result, Exception):
+            future.set_exception(result)
+            continue
+        fields, seconds, fallback = result
+        _record_metrics(seconds, fallback)
+        future.set_result(fields)
+
+
+def _archived_batches(
+    source: archive.Archive, batch_size: int
+) -> Iterator[tuple[list[str], list[str]]]:
+    urls: list[str] = []
+    pages: list[str] = []
+    for url in source.urls():
+        urls.append(url)
+        pages.append(source.load(url))
+        if len(urls) >= batch_size:
+            yield urls, pages
+            urls, pages = [], []
+    if urls:
+        yield urls, pages
+
+
+def reparse_archive(workers: int | None = None, *, batch_size: int = BATCH_SIZE) -> int:
+    """Parse every archived abs page again and update the cached papers.
+
+    Batches of ``batch_size`` pages are parsed by ``workers`` processes
+    (default: one per core; ``0`` parses in this process).  Returns the
+    number of pages parsed, which is zero when archiving is disabled.
+    """
+
+    source = archive.get_archive()
+    if source is None:
+        logger.warning("NEWSLETTER_ARCHIVE_DIR is not set; nothing to reparse")
+        return 0
+    batches = _archived_batches(source, batch_size)
+    if workers == 0:
+        count = _store_parsed((urls, parse_abs_pages(pages)) for urls, pages in batches)
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            count = _store_parsed(_parse_in_pool(executor, batches, 2 * workers))
+    cache.flush()
+    logger.info("Reparsed %d archived pages", count)
+    return count
+
+
+def _parse_in_pool(
+    executor: ProcessPoolExecutor,
+    batches: Iterator[tuple[list[str], list[str]]],
+    limit: int,
+) -> Iterator[tuple[list[str], list[Parsed]]]:
+    # Keep a few batches per worker in flight so the archive is streamed
+    # rather than loaded into memory at once
+    pending: collections.deque = collections.deque()
+    for urls, pages in batches:
+        pending.append((urls, executor.submit(parse_abs_pages, pages)))
+        if len(pending) >= limit:
+            urls, done = pending.popleft()
+            yield urls, done.result()
+    while pending:
+        urls, done = pending.popleft()
+        yield urls, done.result()
+
+
+def _store_parsed(results: Iterator[tuple[list[str], list[Parsed]]]) -> int:
+    count = 0
+    for urls, parsed in results:
+        for url, result in zip(urls, parsed):
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Could not parse the archived page of %s: %s", url, result
+                )
+                continue
+            fields, seconds, fallback = result
+            _record_metrics(seconds, fallback)
+            Paper.from_fields(url, fields)
+            count += 1
+    return count
@@ -0,0 +1,612 @@
+"""Download recent arXiv papers concurrently and save to JSONL.
+
+Run as ``newsletter fetch`` or ``python -m newsletter.pipeline``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Iterable
+
+import httpx
+import numpy as np
+
+from . import cache, client, dedup, metrics, scoring
+from .arxiv import CATEGORIES, aiter_recent_listings, arxiv_id
+from .paper import Paper
+from .parsing import ParserPool
+from .utils import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FILE = "papers.jsonl"
+# Appended to the output file name to locate the run manifest
+MANIFEST_SUFFIX = ".manifest.json"
+# Appended to the output file name to locate the run's metrics summary
+METRICS_SUFFIX = ".metrics.json"
+# Appended to the output file name for papers written before scoring
+STAGED_SUFFIX = ".partial"
+# Appended to the output file name for the journal of an unfinished run
+JOURNAL_SUFFIX = ".journal"
+
+# Maximum number of simultaneous requests to arxiv.org
+ARXIV_CONCURRENCY = 8
+# Maximum number of simultaneous search engine queries
+SEARCH_CONCURRENCY = 2
+# Number of processes parsing abs pages; 0 parses in the event loop, which
+# is faster on a single core
+PARSE_WORKERS = os.cpu_count() if (os.cpu_count() or 1) > 1 else 0
+# Capacity of the queues between pipeline stages
+QUEUE_SIZE = 100
+# Number of papers loaded at once while collecting scoring signals
+SCORE_CHUNK = 10_000
+# Handling of near-duplicates of cached papers: "merge" reuses their search
+# results, "skip" leaves them out of the output and "keep" ignores them
+DUPLICATES = "merge"
+
+# Marks the end of a pipeline stage's input
+_DONE = object()
+
+
+async def search_paper(paper: Paper, *, google_results: int = 10) -> Paper:
+    """Query search engines for ``paper`` and return it."""
+
+    # ``googlesearch`` is blocking, so searches run in worker threads; the
+    # search stage bounds how many run at once
+    await asyncio.to_thread(paper.query_google, num_results=google_results)
+    return paper
+
+
+def merge_duplicate(paper: Paper, *, skip: bool = False) -> Paper | None:
+    """Reuse the search results of a cached near-duplicate of ``paper``.
+
+    Returns ``paper``, with ``google_results`` copied from its duplicate when
+    that was searched already, or ``None`` if it has a duplicate and
+    ``skip`` is set.  Papers that already have search results are returned
+    unchanged.
+    """
+
+    if paper.google_results is not None:
+        return paper
+    original = dedup.find_duplicate(
+        paper.title, paper.abstract, exclude=paper.arxiv_url
+    )
+    if original is None:
+        return paper
+    metrics.increment("duplicates_found")
+    if skip:
+        logger.info("Skipping %s, a duplicate of %s", paper.arxiv_url, original)
+        return None
+    record = cache.get_paper(original)
+    if record and record.get("google_results") is not None:
+        logger.info("Reusing search results of %s for %s", original, paper.arxiv_url)
+        paper.google_results = record["google_results"]
+        cache.update_paper(
+            paper.arxiv_url,
+            {"google_results": paper.google_results},
+            default=paper.to_dict(),
+        )
+        metrics.increment("duplicates_merged")
+    return paper
+
+
+def load_previous_papers(output_file: str, manifest_file: str) -> dict[str, Paper]:
+    """Return the papers written by the previous run keyed by arXiv identifier.
+
+    Only papers recorded in the run manifest are returned, so a partially
+    written or foreign output file is not trusted, and lines that cannot be
+    decoded are skipped.  Missing files yield an empty dictionary.
+    """
+
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as fh:
+            ids = set(json.load(fh)["ids"])
+        papers = {}
+        with open(output_file, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    data = loads(line)
+                except ValueError:
+                    logger.warning("Skipping an unreadable line of %s", output_file)
+                    continue
+                paper = Paper.from_dict(data)
+                ident = arxiv_id(paper.arxiv_url)
+                if ident in ids:
+                    papers[ident] = paper
+    except FileNotFoundError:
+        return {}
+    return papers
+
+
+def save_manifest(manifest_file: str, ids: list[str]) -> None:
+    """Record the arXiv identifiers ``ids`` written by this run."""
+
+    tmp = manifest_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"ids": ids}, fh)
+    os.replace(tmp, manifest_file)
+
+
+def _read_lines(path: str) -> list[dict[str, Any]]:
+    """Return the JSON lines of ``path``, dropping an unfinished last line.
+
+    A line cut short by a crash is also removed from the file so that
+    appending to it continues with a valid line.  A missing file has no
+    lines.
+    """
+
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    except FileNotFoundError:
+        return []
+    end = data.rfind(b"\n") + 1
+    if end < len(data):
+        os.truncate(path, end)
+    return [loads(line) for line in data[:end].splitlines() if line.strip()]
+
+
+class RunJournal:
+    """Durable record of the progress of a run.
+
+    Finished papers are appended to the staging file (:data:`STAGED_SUFFIX`)
+    and papers whose metadata was fetched, as well as failures, to the
+    journal (:data:`JOURNAL_SUFFIX`).  Every line is flushed when it is
+    written, so a crashed or killed run can be resumed: with ``resume`` the
+    papers in :attr:`done` need no more work and those in :attr:`fetched`
+    only need to be searched.  Without it both files start empty.
+    """
+
+    def __init__(self, output_file: str, *, resume: bool = False) -> None:
+        self.staged_file = output_file + STAGED_SUFFIX
+        self.journal_file = output_file + JOURNAL_SUFFIX
+        self.done: set[str] = set()
+        self.fetched: dict[str, Paper] = {}
+        if resume:
+            self.done = {data["arxiv_url"] for data in _read_lines(self.staged_file)}
+            for entry in _read_lines(self.journal_file):
+                if "fetched" in entry:
+                    paper = Paper.from_dict(entry["fetched"])
+                    if paper.arxiv_url not in self.done:
+                        self.fetched[paper.arxiv_url] = paper
+            logger.info(
+                "Resuming a run with %d finished and %d fetched papers",
+                len(self.done),
+                len(self.fetched),
+            )
+        elif os.path.exists(self.journal_file):
+            logger.warning("Discarding the unfinished previous run, see --resume")
+        mode = "a" if resume else "w"
+        self._staged = open(self.staged_file, mode, encoding="utf-8")
+        self._journal = open(self.journal_file, mode, encoding="utf-8")
+
+    @staticmethod
+    def _write(fh: Any, data: dict[str, Any]) -> None:
+        fh.write(dumps(data))
+        fh.write("\n")
+        fh.flush()
+
+    def record_fetched(self, paper: Paper) -> None:
+        """Record that the metadata of ``paper`` was fetched."""
+        self._write(self._journal, {"fetched": paper.to_dict()})
+
+    def record_finished(self, paper: Paper) -> None:
+        """Append the finished ``paper`` to the staging file."""
+        self._write(self._staged, paper.to_dict())
+
+    def record_failed(self, url: str, stage: str, exc: BaseException) -> None:
+        """Record that ``stage`` failed for ``url``; it is retried on resume."""
+        self._write(self._journal, {"failed": url, "stage": stage, "error": str(exc)})
+
+    def close(self) -> None:
+        self._staged.close()
+        self._journal.close()
+
+    def remove(self) -> None:
+        """Close and delete both files once the run is complete."""
+        self.close()
+        os.remove(self.staged_file)
+        os.remove(self.journal_file)
+
+
+async def _run_stage(
+    inbox: asyncio.Queue,
+    outbox: asyncio.Queue,
+    workers: int,
+    process: Callable[[Any], Awaitable[Iterable[Any]]],
+    on_error: Callable[[Any, Exception], None] | None = None,
+) -> None:
+    """Move items from ``inbox`` through ``process`` to ``outbox``.
+
+    ``workers`` items are processed at a time.  The stage ends when it takes
+    :data:`_DONE` from ``inbox`` and then passes it on to ``outbox``.  If
+    ``on_error`` is given an item whose processing raises is passed to it
+    together with the exception and the stage continues; otherwise the
+    exception ends the stage.
+    """
+
+    async def worker() -> None:
+        while (item := await inbox.get()) is not _DONE:
+            try:
+                results = await process(item)
+            except Exception as exc:
+                if on_error is None:
+                    raise
+                on_error(item, exc)
+                continue
+            for result in results:
+                await outbox.put(result)
+        # Let the other workers of this stage see the end of the input too
+        await inbox.put(_DONE)
+
+    await asyncio.gather(*(worker() for _ in range(max(workers, 1))))
+    await outbox.put(_DONE)
+
+
+def write_scored(
+    staged_file: str, output_file: str, listed: dict[str, list[str]]
+) -> list[str]:
+    """Score the papers of ``staged_file`` and write them best first.
+
+    The file is read twice: once in chunks of :data:`SCORE_CHUNK` papers to
+    collect the scoring signals and once in score order to write
+    ``output_file``, so that only the signals are held in memory.  Categories
+    are taken from the complete listing in ``listed`` and stored in the
+    cache.  ``output_file`` is replaced only once it is complete, so an
+    interrupted run leaves the previous one intact.  Returns the arXiv
+    identifiers in the order written.
+    """
+
+    names = list(scoring.WEIGHTS)
+    today = date.today()
+    offsets: list[int] = []
+    columns: list[np.ndarray] = []
+    chunk: list[Paper] = []
+    with open(staged_file, "rb") as fh:
+        offset = 0
+        for line in fh:
+            offsets.append(offset)
+            offset += len(line)
+            paper = Paper.from_dict(loads(line))
+            paper.categories = listed.get(paper.arxiv_url, paper.categories)
+            chunk.append(paper)
+            if len(chunk) >= SCORE_CHUNK:
+                columns.append(scoring.signal_matrix(chunk, names, today))
+                chunk = []
+    if chunk or not columns:
+        columns.append(scoring.signal_matrix(chunk, names, today))
+    scores = scoring.score_matrix(np.hstack(columns), scoring.WEIGHTS)
+    order = np.argsort(-scores, kind="stable")
+
+    ids = []
+    tmp = output_file + ".tmp"
+    with open(staged_file, "rb") as src, open(tmp, "w", encoding="utf-8") as dst:
+        for i in order.tolist():
+            src.seek(offsets[i])
+            data = loads(src.readline())
+            url = data["arxiv_url"]
+            data["categories"] = listed.get(url, data.get("categories", []))
+            data["combined_score"] = float(scores[i])
+            cache.update_paper(url, {"categories": data["categories"]}, default=data)
+            dst.write(dumps(data))
+            dst.write("\n")
+            ids.append(arxiv_id(url))
+    os.replace(tmp, output_file)
+    logger.info("Scored and wrote %d papers", len(ids))
+    return ids
+
+
+async def main(
+    output_file: str | None = None,
+    *,
+    arxiv_concurrency: int = ARXIV_CONCURRENCY,
+    search_concurrency: int = SEARCH_CONCURRENCY,
+    batch_size: int = 0,
+    refresh: bool = False,
+    incremental: bool = False,
+    categories: Iterable[str] = CATEGORIES,
+    prometheus_file: str | None = None,
+    parse_workers: int = PARSE_WORKERS,
+    queue_size: int = QUEUE_SIZE,
+    duplicates: str = DUPLICATES,
+    resume: bool = False,
+) -> None:
+    """Download recent papers and write them to ``output_file``.
+
+    The run is a pipeline of stages connected by queues of ``queue_size``
+    items: the listings of ``categories`` are streamed, metadata is fetched
+    by ``arxiv_concurrency`` workers, ``search_concurrency`` workers query
+    search engines and each finished paper is appended to a staging file.
+    A full queue pauses the stage feeding it, so memory stays flat and slow
+    searches do not hold up metadata fetching.  Scores are computed in a
+    final pass over the staging file by :func:`write_scored`.
+
+    Progress is recorded in a :class:`RunJournal` as the run goes.  A paper
+    whose fetch or search fails is logged, recorded and left out without
+    stopping the run.  After a crash ``resume`` continues the unfinished run:
+    finished papers are kept and fetched papers are only searched.
+
+    Papers cross-listed in several categories are fetched and searched only
+    once.  With a positive ``batch_size`` metadata is loaded through the arXiv
+    export API in batches of that size instead of one abs page per paper.
+    ``refresh`` revalidates cached abs pages instead of trusting the cache.
+    In ``incremental`` mode papers recorded in the manifest of the previous
+    run are taken from ``output_file`` with their stored search results and
+    only new identifiers are fetched and searched; scores are recomputed
+    over the combined set.
+
+    Abs pages are parsed by ``parse_workers`` processes while the event loop
+    keeps fetching; with ``0`` they are parsed in the event loop.
+
+    Before searching, each paper is checked against the near-duplicate index
+    of the cache (:mod:`newsletter.dedup`).  ``duplicates`` selects what
+    happens to duplicates, see :data:`DUPLICATES` and :func:`merge_duplicate`.
+
+    Timings and counters of the run are written to ``output_file`` with
+    :data:`METRICS_SUFFIX` appended and, if given, to the Prometheus textfile
+    ``prometheus_file``.
+    """
+
+    if output_file is None:
+        output_file = OUTPUT_FILE
+
+    metrics.reset()
+    start = time.perf_counter()
+    manifest_file = output_file + MANIFEST_SUFFIX
+    previous = load_previous_papers(output_file, manifest_file) if incremental else {}
+
+    logger.info(
+        "Fetching recent arXiv URLs and paper metadata "
+        "(arxiv_concurrency=%d, search_concurrency=%d)",
+        arxiv_concurrency,
+        search_concurrency,
+    )
+    fetch_queue: asyncio.Queue = asyncio.Queue(queue_size)
+    search_queue: asyncio.Queue = asyncio.Queue(queue_size)
+    sink_queue: asyncio.Queue = asyncio.Queue(queue_size)
+    listed: dict[str, list[str]] = {}
+    reused = 0
+    failed = 0
+    journal = RunJournal(output_file, resume=resume)
+
+    async def list_papers(http: httpx.AsyncClient) -> None:
+        nonlocal reused
+        pending: list[str] = []
+        async for url, paper_categories in aiter_recent_listings(
+            categories, http_client=http
+        ):
+            listed[url] = paper_categories
+            paper = previous.get(arxiv_id(url))
+            if url in journal.done:
+                continue
+            elif url in journal.fetched:
+                await search_queue.put(journal.fetched[url])
+            elif paper is not None:
+                reused += 1
+                # Papers whose search failed in the previous run are searched again
+                queue = sink_queue if paper.google_results is not None else search_queue
+                await queue.put(paper)
+            elif batch_size > 0:
+                pending.append(url)
+                if len(pending) >= batch_size:
+                    await fetch_queue.put(pending)
+                    pending = []
+            else:
+                await fetch_queue.put(url)
+        if pending:
+            await fetch_queue.put(pending)
+        await fetch_queue.put(_DONE)
+        metrics.observe("listing_seconds", time.perf_counter() - start)
+        logger.info(
+            "Retrieved %d unique URLs (%d reused from the previous run)",
+            len(listed),
+            reused,
+        )
+
+    async def fetch(item: str | list[str]) -> list[Paper]:
+        if isinstance(item, list):
+            loop = asyncio.get_running_loop()
+            papers = await asyncio.to_thread(
+                Paper.from_ids,
+                item,
+                batch_size=batch_size,
+                refresh=refresh,
+                # Only the papers whose fallback failed leave the batch; they
+                # are recorded from the event loop like the other failures
+                on_error=lambda url, exc: loop.call_soon_threadsafe(
+                    fetch_failed, url, exc
+                ),
+            )
+        else:
+            papers = [
+                await Paper.afrom_url(
+                    item, http_client=http, refresh=refresh, parser=parser
+                )
+            ]
+        for paper in papers:
+            journal.record_fetched(paper)
+        return papers
+
+    def on_error(stage: str) -> Callable[[Any, Exception], None]:
+        def record(item: Any, exc: Exception) -> None:
+            nonlocal failed
+            urls = (
+                item if isinstance(item, list) else [getattr(item, "arxiv_url", item)]
+            )
+            for url in urls:
+                logger.warning("Could not %s %s: %s", stage, url, exc)
+                journal.record_failed(url, stage, exc)
+            failed += len(urls)
+
+        return record
+
+    fetch_failed = on_error("fetch")
+
+    async def search(paper: Paper) -> list[Paper]:
+        if duplicates != "keep":
+            paper = await asyncio.to_thread(
+                merge_duplicate, paper, skip=duplicates == "skip"
+            )
+            if paper is None:
+                return []
+        return [await search_paper(paper)]
+
+    async def sink() -> int:
+        written = 0
+        while (paper := await sink_queue.get()) is not _DONE:
+            journal.record_finished(paper)
+            written += 1
+        return written
+
+    parser = ParserPool(parse_workers) if parse_workers > 0 else None
+    try:
+        async with client.create_async_client(pool_size=arxiv_concurrency) as http:
+            stages = [
+                asyncio.create_task(list_papers(http)),
+                asyncio.create_task(
+                    _run_stage(
+                        fetch_queue,
+                        search_queue,
+                        arxiv_concurrency,
+                        fetch,
+                        fetch_failed,
+                    )
+                ),
+                asyncio.create_task(
+                    _run_stage(
+                        search_queue,
+                        sink_queue,
+                        search_concurrency,
+                        search,
+                        on_error("search"),
+                    )
+                ),
+                asyncio.create_task(sink()),
+            ]
+            try:
+                await asyncio.gather(*stages)
+            finally:
+                for task in stages:
+                    task.cancel()
+        logger.info(
+            "Fetched %d papers (%d resumed, %d failed)",
+            stages[-1].result(),
+            len(journal.done),
+            failed,
+        )
+        journal.close()
+        with metrics.timer("write_seconds"):
+            ids = write_scored(journal.staged_file, output_file, listed)
+            save_manifest(manifest_file, ids)
+        journal.remove()
+    finally:
+        journal.close()
+        if parser is not None:
+            parser.close()
+        cache.flush()
+    metrics.increment("papers_written", len(ids))
+    metrics.increment("papers_reused", reused)
+    metrics.increment("papers_failed", failed)
+    metrics.observe("run_seconds", time.perf_counter() - start)
+    metrics.log_report()
+    metrics.write_json(output_file + METRICS_SUFFIX)
+    if prometheus_file:
+        metrics.write_prometheus(prometheus_file)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--arxiv-concurrency",
+        type=int,
+        default=ARXIV_CONCURRENCY,
+        help="maximum simultaneous requests to arxiv.org",
+    )
+    parser.add_argument(
+        "--search-concurrency",
+        type=int,
+        default=SEARCH_CONCURRENCY,
+        help="maximum simultaneous search engine queries",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="load metadata from the arXiv export API in batches of this size",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="revalidate cached abs pages with conditional requests",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only fetch papers that are new since the previous run",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the unfinished previous run, skipping finished work",
+    )
+    parser.add_argument(
+        "--category",
+        dest="categories",
+        action="append",
+        help=f"arXiv category to include (repeatable, default: {' '.join(CATEGORIES)})",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=PARSE_WORKERS,
+        help="processes parsing abs pages (0 parses in the fetching thread)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUEUE_SIZE,
+        help="capacity of the queues between pipeline stages",
+    )
+    parser.add_argument(
+        "--duplicates",
+        choices=("merge", "skip", "keep"),
+        default=DUPLICATES,
+        help="reuse the search results of near-duplicate papers, leave them "
+        "out or treat them as new",
+    )
+    parser.add_argument(
+        "--prometheus-file",
+        help="also write run metrics to this Prometheus textfile",
+    )
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] | None = None) -> None:
+    """Run :func:`main` with the command line arguments ``argv``."""
+
+    args = parse_args(argv)
+    asyncio.run(
+        main(
+            arxiv_concurrency=args.arxiv_concurrency,
+            search_concurrency=args.search_concurrency,
+            batch_size=args.batch_size,
+            refresh=args.refresh,
+            incremental=args.incremental,
+            categories=args.categories or CATEGORIES,
+            prometheus_file=args.prometheus_file,
+            parse_workers=args.parse_workers,
+            queue_size=args.queue_size,
+            duplicates=args.duplicates,
+            resume=args.resume,
+        )
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run()
@@ -0,0 +1,174 @@
+"""Secondary indexes and queries over the cached papers.
+
+:mod:`newsletter.cache` looks papers up by URL only.  This module keeps
+indexes on author, submission date and title words in the cache database,
+updated whenever the cache flushes, so that :func:`find_papers` answers
+questions such as "papers by this author in the last 30 days" with index
+lookups instead of a scan over every cached record.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+from datetime import date
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from . import cache
+from .utils import tokenize
+
+if TYPE_CHECKING:
+    from .paper import Paper
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS query_papers ("
+    "url TEXT PRIMARY KEY, submission_date TEXT NOT NULL, digest TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS query_papers_date ON query_papers (submission_date)",
+    "CREATE TABLE IF NOT EXISTS query_authors ("
+    "author TEXT NOT NULL, url TEXT NOT NULL,"
+    " PRIMARY KEY (author, url)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS query_authors_url ON query_authors (url)",
+    "CREATE TABLE IF NOT EXISTS query_terms ("
+    "term TEXT NOT NULL, url TEXT NOT NULL,"
+    " PRIMARY KEY (term, url)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS query_terms_url ON query_terms (url)",
+)
+
+
+def normalize_author(name: str) -> str:
+    """Return the index key of an author name.
+
+    ``Last, First`` (abs pages) and ``First Last`` (export API) map to the
+    same key, and case and spacing are ignored.
+    """
+
+    if "," in name:
+        last, first = name.split(",", 1)
+        name = f"{first} {last}"
+    return " ".join(name.casefold().split())
+
+
+def index_records(
+    conn: sqlite3.Connection, records: Iterable[tuple[str, dict[str, Any]]]
+) -> int:
+    """Index ``(url, record)`` pairs whose authors, date or title changed.
+
+    Records without a submission date are not papers and are skipped.  Must
+    be called inside a transaction on the cache database ``conn``.
+    Returns the number of papers (re)indexed.
+    """
+
+    count = 0
+    for url, record in records:
+        submitted = record.get("submission_date")
+        authors = record.get("authors") or []
+        title = record.get("title", "")
+        key = "\x1f".join([str(submitted), title, *authors])
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        row = conn.execute(
+            "SELECT digest FROM query_papers WHERE url = ?", (url,)
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            continue
+        remove_urls(conn, [url])
+        if not submitted:
+            continue
+        conn.execute(
+            "INSERT INTO query_papers VALUES (?, ?, ?)", (url, submitted, digest)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO query_authors VALUES (?, ?)",
+            ((normalize_author(author), url) for author in authors),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO query_terms VALUES (?, ?)",
+            ((term, url) for term in set(tokenize(title))),
+        )
+        count += 1
+    return count
+
+
+def remove_urls(conn: sqlite3.Connection, urls: Iterable[str]) -> None:
+    """Drop ``urls`` from the indexes; must run inside a cache transaction."""
+    for url in urls:
+        conn.execute("DELETE FROM query_authors WHERE url = ?", (url,))
+        conn.execute("DELETE FROM query_terms WHERE url = ?", (url,))
+        conn.execute("DELETE FROM query_papers WHERE url = ?", (url,))
+
+
+def find_urls(
+    *,
+    author: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    keywords: str | None = None,
+    limit: int | None = None,
+) -> list[str]:
+    """Return the URLs of cached papers matching all given conditions.
+
+    See :func:`find_papers` for the conditions.  URLs are ordered newest
+    first.
+    """
+
+    conn = cache._connection()
+    if conn is None:
+        return []
+    cache.flush()
+    joins, where, params = [], [], []
+    if author is not None:
+        joins.append("JOIN query_authors a ON a.url = q.url AND a.author = ?")
+        params.append(normalize_author(author))
+    for i, term in enumerate(dict.fromkeys(tokenize(keywords or ""))):
+        joins.append(f"JOIN query_terms t{i} ON t{i}.url = q.url AND t{i}.term = ?")
+        params.append(term)
+    if since is not None:
+        where.append("q.submission_date >= ?")
+        params.append(since.isoformat())
+    if until is not None:
+        where.append("q.submission_date <= ?")
+        params.append(until.isoformat())
+    sql = " ".join(
+        [
+            "SELECT q.url FROM query_papers q",
+            *joins,
+            "WHERE " + " AND ".join(where) if where else "",
+            "ORDER BY q.submission_date DESC, q.url",
+            "LIMIT ?",
+        ]
+    )
+    params.append(-1 if limit is None else limit)
+    with cache._lock:
+        return [url for (url,) in conn.execute(sql, params)]
+
+
+def find_papers(
+    *,
+    author: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    keywords: str | None = None,
+    limit: int | None = None,
+) -> Iterator["Paper"]:
+    """Yield cached papers matching all given conditions, newest first.
+
+    ``author`` matches one of the paper's authors in either name order,
+    ``since`` and ``until`` bound the submission date (inclusive) and every
+    word of ``keywords`` must occur in the title.  Matches are found in the
+    indexes up front, while each :class:`~newsletter.paper.Paper` is only
+    loaded from the cache when the iteration reaches it.
+    """
+
+    from .paper import Paper
+
+    urls = find_urls(
+        author=author, since=since, until=until, keywords=keywords, limit=limit
+    )
+    conn = cache._connection()
+    for url in urls:
+        with cache._lock:
+            found = cache._get_locked(conn, url)
+        if found is not None:
+            yield Paper._from_record(url, found[0])
@@ -0,0 +1,212 @@
+"""Per-host rate limiting with adaptive backoff.
+
+Every outbound request is made through :func:`call` (or :func:`acall` for
+coroutines), which takes a token from the :class:`TokenBucket` of the target
+host before each attempt.  Responses with a throttling or server error status
+(see :data:`RETRY_STATUSES`), or exceptions carrying such a response, are
+retried up to :data:`MAX_RETRIES` times.  The delay honours ``Retry-After`` and
+otherwise grows exponentially with jitter.  Buckets adapt additively-increase /
+multiplicatively-decrease: a throttled attempt halves the host's rate and each
+success raises it again towards the configured maximum.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Requests per second and burst size for each rate-limited host.  Hosts not
+# listed here are not paced but failed attempts are still retried.
+LIMITS: dict[str, tuple[float, int]] = {
+    "arxiv.org": (4.0, 4),
+    # The export API asks for at most one request every three seconds
+    "export.arxiv.org": (1 / 3, 1),
+    "www.google.com": (0.2, 1),
+}
+
+# Statuses that indicate throttling or a transient server failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Statuses after which the host's rate is reduced
+THROTTLE_STATUSES = (429, 503)
+MAX_RETRIES = 4
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate adapts to throttling."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return the number of seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        """Wait asynchronously until a token is available."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def throttle(self, pause: float = 0.0) -> None:
+        """Halve the rate and stop handing out tokens for ``pause`` seconds."""
+        with self._lock:
+            self.rate = max(self.rate / 2, self.min_rate)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            logger.info("Reduced rate to %.3f requests/s", self.rate)
+
+    def recover(self) -> None:
+        """Raise the rate by a tenth of its maximum after a successful attempt."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(host: str) -> TokenBucket | None:
+    """Return the bucket pacing ``host`` or ``None`` if it is not rate limited."""
+    with _buckets_lock:
+        if host not in _buckets:
+            if host not in LIMITS:
+                return None
+            _buckets[host] = TokenBucket(*LIMITS[host])
+        return _buckets[host]
+
+
+def reset() -> None:
+    """Forget all buckets so that changes to :data:`LIMITS` take effect."""
+    with _buckets_lock:
+        _buckets.clear()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds requested by a ``Retry-After`` header."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return the jittered exponential backoff delay for retry ``attempt``."""
+    delay = min(MAX_DELAY, BASE_DELAY * 2**attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def _response(outcome: Any) -> Any:
+    # Exceptions such as ``requests.HTTPError`` carry the failed response
+    return (
+        getattr(outcome, "response", None)
+        if isinstance(outcome, BaseException)
+        else outcome
+    )
+
+
+def _retry_delay(
+    host: str, bucket: TokenBucket | None, outcome: Any, attempt: int
+) -> float | None:
+    """Return how long to wait before retrying ``outcome`` or ``None`` to stop."""
+    response = _response(outcome)
+    status = getattr(response, "status_code", None)
+    if status not in RETRY_STATUSES:
+        if bucket is not None and not isinstance(outcome, BaseException):
+            bucket.recover()
+        return None
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if bucket is not None and status in THROTTLE_STATUSES:
+        bucket.throttle(retry_after or 0.0)
+    if attempt >= MAX_RETRIES:
+        logger.warning(
+            "Giving up on %s after %d attempts (status %s)", host, attempt + 1, status
+        )
+        return None
+    delay = (
+        backoff_delay(attempt) if retry_after is None else min(retry_after, MAX_DELAY)
+    )
+    logger.info("Status %s from %s; retrying in %.1fs", status, host, delay)
+    return delay
+
+
+def call(host: str, func: Callable[[], T]) -> T:
+    """Call ``func`` under the rate limit of ``host``, retrying throttled attempts.
+
+    ``func`` returns a response with ``status_code`` and ``headers`` or raises
+    an exception whose ``response`` attribute holds one.  Once retries are
+    exhausted the last response is returned or the last exception re-raised.
+    """
+    bucket = bucket_for(host)
+    attempt = 0
+    while True:
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            outcome: Any = func()
+        except Exception as exc:
+            outcome = exc
+        delay = _retry_delay(host, bucket, outcome, attempt)
+        if delay is None:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        time.sleep(delay)
+        attempt += 1
+
+
+async def acall(host: str, func: Callable[[], Awaitable[T]]) -> T:
+    """Asynchronous counterpart of :func:`call` for coroutine functions."""
+    bucket = bucket_for(host)
+    attempt = 0
+    while True:
+        if bucket is not None:
+            await bucket.aacquire()
+        try:
+            outcome: Any = await func()
+        except Exception as exc:
+            outcome = exc
+        delay = _retry_delay(host, bucket, outcome, attempt)
+        if delay is None:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
+import json
 import logging
-from dataclasses import asdict
-from datetime import date
+import re
 from html import unescape
-from typing import TYPE_CHECKING, Callable
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any, Callable
 
-from bs4 import BeautifulSoup
+try:  # optional, faster JSON encoding
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
 
 if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
     from .paper import Paper
 
 logger = logging.getLogger(__name__)
 
+# End of the document head; citation meta tags never appear after it
+_HEAD_END = re.compile(r"</head\s*>|<body[\s>]", re.IGNORECASE)
+
+# Index terms of tokenize() and the common words dropped from them
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this "
+    "to we with our via using based towards".split()
+)
+
 
 def extract_meta(soup: BeautifulSoup, name: str) -> str | None:
     """Return the content of a ``citation_*`` meta tag if present."""
@@ -26,10 +42,107 @@ def extract_meta(soup: BeautifulSoup, name: str) -> str | None:
     return None
 
 
-def serialize_paper(paper: "Paper", *, asdict_fn: Callable = asdict) -> dict:
-    """Return a JSON-serialisable representation of ``paper``."""
+class _CitationMetaParser(HTMLParser):
+    """Collect the ``content`` of every ``<meta name="citation_*">`` tag."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.meta: dict[str, list[str]] = {}
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag != "meta":
+            return
+        values = dict(attrs)
+        name = values.get("name")
+        content = values.get("content")
+        if name and name.startswith("citation_") and content is not None:
+            self.meta.setdefault(name, []).append(unescape(content))
+
+
+def parse_citation_meta(html: str) -> dict[str, list[str]]:
+    """Return all ``citation_*`` meta tags in the head of ``html``.
+
+    The document is scanned once and parsing stops at ``</head>``.  Each tag
+    name maps to the list of its values in document order, since tags such as
+    ``citation_author`` repeat.
+    """
+
+    end = _HEAD_END.search(html)
+    parser = _CitationMetaParser()
+    parser.feed(html[: end.start()] if end else html)
+    parser.close()
+    logger.debug("Extracted %d citation meta tags", len(parser.meta))
+    return parser.meta
+
+
+def soup_citation_meta(html: str) -> dict[str, list[str]]:
+    """Return all ``citation_*`` meta tags of ``html`` using BeautifulSoup.
+
+    Slower than :func:`parse_citation_meta` but searches the whole document,
+    so it is used as a fallback for pages without tags in their head.
+    """
+
+    # Imported here as only this fallback parser needs BeautifulSoup
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    meta: dict[str, list[str]] = {}
+    for tag in soup.find_all("meta", attrs={"name": re.compile("^citation_")}):
+        if tag.has_attr("content"):
+            meta.setdefault(tag["name"], []).append(unescape(tag["content"]))
+    return meta
+
+
+def dumps(obj: Any) -> str:
+    """Return compact JSON for ``obj``, using :mod:`orjson` when installed.
 
+    The standard library fallback produces the same output.
+    """
+
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(text: str | bytes) -> Any:
+    """Parse JSON ``text``, using :mod:`orjson` when installed."""
+
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def tokenize(text: str) -> list[str]:
+    """Return the lower-case index terms of ``text`` without stopwords."""
+    return [
+        token
+        for token in _TOKEN.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+def serialize_paper(paper: "Paper", *, asdict_fn: Callable | None = None) -> dict:
+    """Return a JSON-serialisable representation of ``paper``.
+
+    This is :meth:`~newsletter.paper.Paper.to_dict` unless ``asdict_fn`` is
+    given to build the dictionary instead.
+    """
+
+    if asdict_fn is None:
+        return paper.to_dict()
     data = asdict_fn(paper)
-    if isinstance(data.get("submission_date"), date):
+    if hasattr(data.get("submission_date"), "isoformat"):
         data["submission_date"] = data["submission_date"].isoformat()
     return data
+
+
+def deserialize_paper(data: dict) -> "Paper":
+    """Return the :class:`~newsletter.paper.Paper` described by ``data``.
+
+    This is the inverse of :func:`serialize_paper`; unknown keys such as
+    ``combined_score`` are ignored.
+    """
+
+    from .paper import Paper
+
+    return Paper.from_dict(data)
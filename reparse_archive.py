@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""Parse archived abs pages again and update the paper cache."""
+
+import argparse
+import logging
+
+from newsletter.parsing import BATCH_SIZE, reparse_archive
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="parser processes (default: one per core, 0 parses in this process)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="pages sent to a parser process at once",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    reparse_archive(args.workers, batch_size=args.batch_size)
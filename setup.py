@@ -3,6 +3,9 @@ from setuptools import setup, find_packages
 setup(
     name="newsletter",
     version="0.1.0",
-    packages=find_packages(),
-    install_requires=["requests", "beautifulsoup4"],
+    packages=find_packages(exclude=["tests", "benchmarks"]),
+    python_requires=">=3.10",
+    install_requires=["requests", "httpx", "beautifulsoup4", "numpy"],
+    extras_require={"fast": ["orjson", "zstandard"]},
+    entry_points={"console_scripts": ["newsletter = newsletter.cli:main"]},
 )
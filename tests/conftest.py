@@ -0,0 +1,135 @@
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+
+from newsletter import cache, metrics, ratelimit
+from newsletter.paper import Paper
+
+ATOM_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title type="html">ArXiv Query: id_list=2401.00001,9999.99999</title>
+  <entry>
+    <id>http://arxiv.org/abs/2401.00001v2</id>
+    <updated>2024-01-05T10:00:00Z</updated>
+    <published>2024-01-01T18:00:00Z</published>
+    <title>A Study of
+  Things</title>
+    <summary>  We study things
+and stuff.
+</summary>
+    <author><name>Alice Smith</name></author>
+    <author><name>Bob Jones</name></author>
+  </entry>
+  <entry>
+    <id>http://arxiv.org/api/errors#incorrect_id_format_for_9999.99999</id>
+    <title>Error</title>
+  </entry>
+</feed>
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    """Disable request pacing and retry delays so tests run instantly."""
+    monkeypatch.setattr(ratelimit, "LIMITS", {})
+    monkeypatch.setattr(ratelimit, "BASE_DELAY", 0.0)
+    ratelimit.reset()
+    yield
+    ratelimit.reset()
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Start every test with empty metrics."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def atom_feed():
+    """Trimmed export API response for ``id_list=2401.00001,9999.99999``."""
+    return ATOM_FEED
+
+
+@pytest.fixture
+def abs_page():
+    """Return a function rendering an abs page with the given title."""
+
+    def page(title):
+        return f"""<html><head>
+<meta name="citation_title" content="{title}" />
+<meta name="citation_author" content="Doe, J." />
+<meta name="citation_date" content="2024/02/03" />
+</head><body></body></html>"""
+
+    return page
+
+
+@pytest.fixture
+def mock_response():
+    """Return a function making a mock HTTP response with body ``text``."""
+
+    def response(text, status_code=200, headers=None):
+        return Mock(
+            text=text,
+            status_code=status_code,
+            headers=headers or {},
+            raise_for_status=lambda: None,
+        )
+
+    return response
+
+
+@pytest.fixture
+def mock_session(mock_response):
+    """Return a function making a mock session answering every GET with ``html``."""
+
+    def session(html):
+        session = Mock()
+        session.get.return_value = mock_response(html)
+        return session
+
+    return session
+
+
+@pytest.fixture
+def make_paper():
+    """Return a function building a :class:`Paper` with default fields.
+
+    ``hits`` made-up search results are attached when given, the title is
+    the URL unless overridden and other keywords set the remaining fields.
+    """
+
+    def paper(url, hits=None, day=1, **fields):
+        fields = {
+            "title": url,
+            "abstract": "",
+            "authors": [],
+            "submission_date": date(2024, 1, day),
+            **fields,
+        }
+        if hits is not None:
+            fields["google_results"] = [f"g{i}" for i in range(hits)]
+        return Paper(arxiv_url=url, **fields)
+
+    return paper
+
+
+@pytest.fixture
+def fill_cache(tmp_path, monkeypatch):
+    """Return a function writing ``{url: record}`` to a fresh cache.
+
+    The cache lives in ``tmp_path`` and is flushed, so its indexes are up
+    to date when the function returns.
+    """
+
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+
+    def fill(records):
+        for url, record in records.items():
+            cache.set_paper(url, record)
+        cache.flush()
+
+    return fill
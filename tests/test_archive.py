@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+from newsletter import archive, cache, parsing
+from newsletter.paper import Paper
+
+
+def test_store_and_load_roundtrip(tmp_path):
+    store = archive.Archive(tmp_path)
+    digest = store.store("u1", "<html>é</html>")
+    assert len(digest) == 64
+    assert store.load("u1") == "<html>é</html>"
+    assert store.load("missing") is None
+    store.close()
+
+
+def test_unchanged_content_is_not_stored_again(tmp_path):
+    store = archive.Archive(tmp_path)
+    store.store("u1", "a")
+    size = (tmp_path / "pack-00000.pack").stat().st_size
+    store.store("u1", "a")
+    assert (tmp_path / "pack-00000.pack").stat().st_size == size
+    store.store("u1", "b")
+    assert store.load("u1") == "b"
+    store.close()
+
+
+def test_index_survives_reopen_and_partial_entry(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "PACK_SIZE", 1)
+    store = archive.Archive(tmp_path)
+    for i in range(3):
+        store.store(f"u{i}", f"page {i}")
+    store.close()
+    assert len(list(tmp_path.glob("pack-*.pack"))) == 3
+    with open(tmp_path / "index", "ab") as fh:
+        fh.write(b"partial")
+
+    reopened = archive.Archive(tmp_path)
+    assert len(reopened) == 3
+    assert sorted(reopened.urls()) == ["u0", "u1", "u2"]
+    reopened.store("u3", "page 3")
+    assert archive.Archive(tmp_path).load("u3") == "page 3"
+
+
+def test_urls_are_listed_without_reading_pages(tmp_path):
+    store = archive.Archive(tmp_path)
+    store.store("u1", "page 1")
+    store.store("u2", "page 2")
+    store.close()
+    reopened = archive.Archive(tmp_path)
+    with patch.object(archive, "_decompress") as decompress:
+        assert sorted(reopened.urls()) == ["u1", "u2"]
+    decompress.assert_not_called()
+
+
+def test_from_url_archives_and_reparses(tmp_path, monkeypatch, abs_page, mock_session):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("NEWSLETTER_ARCHIVE_DIR", str(tmp_path / "archive"))
+    url = "http://arxiv.org/abs/1234.5678"
+    Paper.from_url(url, session=mock_session(abs_page("Original")))
+    assert archive.load(url) == abs_page("Original")
+
+    session = mock_session("")
+    cache.update_paper(url, {"title": "Stale"})
+    paper = Paper.from_url(url, session=session, reparse=True)
+    session.get.assert_not_called()
+    assert paper.title == "Original"
+    assert cache.get_paper(url)["title"] == "Original"
+
+
+def test_reparse_archive_updates_cache(tmp_path, monkeypatch, abs_page):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("NEWSLETTER_ARCHIVE_DIR", str(tmp_path / "archive"))
+    for i in range(5):
+        archive.store(f"http://arxiv.org/abs/{i}", abs_page(f"T{i}"))
+    assert parsing.reparse_archive(0, batch_size=2) == 5
+    assert cache.get_paper("http://arxiv.org/abs/3")["title"] == "T3"
+
+    archive.store("http://arxiv.org/abs/3", abs_page("Revised"))
+    assert parsing.reparse_archive(1, batch_size=2) == 5
+    assert cache.get_paper("http://arxiv.org/abs/3")["title"] == "Revised"
+
+
+def test_reparse_without_archive(monkeypatch):
+    monkeypatch.delenv("NEWSLETTER_ARCHIVE_DIR", raising=False)
+    assert parsing.reparse_archive(0) == 0
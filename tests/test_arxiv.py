@@ -1,6 +1,24 @@
+import asyncio
 from unittest.mock import Mock, patch
 
-from newsletter.arxiv import get_recent_arxiv_urls, RECENT_URL, HEADERS
+import httpx
+import pytest
+
+from newsletter import client
+
+from newsletter.arxiv import (
+    EXPORT_URL,
+    RECENT_URL,
+    aiter_recent_arxiv_urls,
+    aiter_recent_listings,
+    arxiv_id,
+    fetch_metadata,
+    get_recent_arxiv_urls,
+    get_recent_listings,
+    iter_recent_arxiv_urls,
+    listing_url,
+    parse_atom_feed,
+)
 
 
 def test_get_recent_arxiv_urls_parses_links():
@@ -11,17 +29,16 @@ def test_get_recent_arxiv_urls_parses_links():
     <a href="/notabs/9999">ignore</a>
     </body></html>
     """
-    mock_response = Mock()
-    mock_response.text = html
-    mock_response.raise_for_status = Mock()
+    session = Mock()
+    session.get.return_value.text = html
+    session.get.return_value.raise_for_status = Mock()
 
-    with patch("newsletter.arxiv.requests.get", return_value=mock_response) as mock_get:
-        urls = get_recent_arxiv_urls()
-        assert urls == [
-            "https://arxiv.org/abs/1234.5678",
-            "https://arxiv.org/abs/2345.6789v2",
-        ]
-        mock_get.assert_called_once_with(RECENT_URL, timeout=10, headers=HEADERS)
+    urls = get_recent_arxiv_urls(session=session)
+    assert urls == [
+        "https://arxiv.org/abs/1234.5678",
+        "https://arxiv.org/abs/2345.6789v2",
+    ]
+    session.get.assert_called_once_with(RECENT_URL, timeout=10, headers={})
 
 
 def test_get_recent_arxiv_urls_dedup_and_sort():
@@ -36,9 +53,177 @@ def test_get_recent_arxiv_urls_dedup_and_sort():
     mock_response.text = html
     mock_response.raise_for_status = Mock()
 
-    with patch("newsletter.arxiv.requests.get", return_value=mock_response):
+    with patch("newsletter.client.get_session") as mock_get_session:
+        mock_get_session.return_value.get.return_value = mock_response
         urls = get_recent_arxiv_urls()
         assert urls == [
             "https://arxiv.org/abs/1234.5678",
             "https://arxiv.org/abs/3456.7890v2",
         ]
+
+
+def test_arxiv_id_strips_url_and_version():
+    assert arxiv_id("https://arxiv.org/abs/2401.00001v3") == "2401.00001"
+    assert arxiv_id("cs/0101001v1") == "cs/0101001"
+    assert arxiv_id("2401.00001") == "2401.00001"
+
+
+def test_parse_atom_feed_extracts_records(atom_feed):
+    assert parse_atom_feed(atom_feed) == [
+        {
+            "id": "2401.00001",
+            "title": "A Study of Things",
+            "abstract": "We study things and stuff.",
+            "authors": ["Alice Smith", "Bob Jones"],
+            "submission_date": "2024-01-01",
+        }
+    ]
+
+
+def test_fetch_metadata_batches_requests(atom_feed):
+    session = Mock()
+    session.get.return_value.text = atom_feed
+    session.get.return_value.raise_for_status = Mock()
+
+    ids = ["2401.00001", "https://arxiv.org/abs/2401.00002v1", "2401.00003"]
+    records = list(fetch_metadata(ids, batch_size=2, session=session))
+
+    assert session.get.call_count == 2
+    first, second = session.get.call_args_list
+    assert first.args == (EXPORT_URL,)
+    assert first.kwargs["params"] == {
+        "id_list": "2401.00001,2401.00002",
+        "max_results": 2,
+    }
+    assert second.kwargs["params"]["id_list"] == "2401.00003"
+    assert [r["id"] for r in records] == ["2401.00001", "2401.00001"]
+
+
+def test_get_recent_arxiv_urls_uses_cached_listing_when_not_modified(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    html = '<html><body><a href="/abs/1234.5678">p</a></body></html>'
+    session = Mock()
+    session.get.return_value = Mock(
+        text=html, status_code=200, headers={"ETag": '"v1"'}
+    )
+    assert get_recent_arxiv_urls(session=session) == ["https://arxiv.org/abs/1234.5678"]
+
+    session.get.return_value = Mock(text="", status_code=304, headers={})
+    assert get_recent_arxiv_urls(session=session) == ["https://arxiv.org/abs/1234.5678"]
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+
+def _page(*ids):
+    links = "".join(
+        f'<a href="/abs/{i}">{i}</a><a href="/pdf/{i}">pdf</a>' for i in ids
+    )
+    return Mock(text=f"<html><body>{links}</body></html>", status_code=200, headers={})
+
+
+def test_iter_recent_arxiv_urls_walks_pages_lazily():
+    session = Mock()
+    session.get.side_effect = [_page("1", "2"), _page("3")]
+
+    urls = iter_recent_arxiv_urls(page_size=2, session=session)
+    assert next(urls) == "https://arxiv.org/abs/1"
+    assert session.get.call_count == 1
+    assert list(urls) == ["https://arxiv.org/abs/2", "https://arxiv.org/abs/3"]
+
+    requested = [call.args[0] for call in session.get.call_args_list]
+    assert requested == [listing_url(0, 2), listing_url(2, 2)]
+
+
+def test_iter_recent_arxiv_urls_stops_on_repeated_page():
+    session = Mock()
+    session.get.side_effect = [_page("1", "2"), _page("1", "2")]
+    urls = list(iter_recent_arxiv_urls(page_size=2, session=session))
+    assert urls == ["https://arxiv.org/abs/1", "https://arxiv.org/abs/2"]
+    assert session.get.call_count == 2
+
+
+def test_aiter_recent_arxiv_urls_yields_across_pages():
+    pages = {
+        listing_url(0, 2): "".join(f'<a href="/abs/{i}">x</a>' for i in ("1", "2")),
+        listing_url(2, 2): '<a href="/abs/3">x</a>',
+    }
+
+    def handler(request):
+        return httpx.Response(200, text=pages[str(request.url)])
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.create_async_client(transport=transport) as http:
+            return [
+                url
+                async for url in aiter_recent_arxiv_urls(page_size=2, http_client=http)
+            ]
+
+    assert asyncio.run(run()) == [
+        "https://arxiv.org/abs/1",
+        "https://arxiv.org/abs/2",
+        "https://arxiv.org/abs/3",
+    ]
+
+
+def test_get_recent_listings_dedupes_cross_listed_papers():
+    pages = {
+        listing_url(0, 10, "cs.AI"): _page("1", "2"),
+        listing_url(0, 10, "cs.LG"): _page("2v2", "3"),
+    }
+    session = Mock()
+    session.get.side_effect = lambda url, **kwargs: pages[url]
+
+    papers = get_recent_listings(["cs.AI", "cs.LG"], page_size=10, session=session)
+
+    assert papers == {
+        "https://arxiv.org/abs/1": ["cs.AI"],
+        "https://arxiv.org/abs/2": ["cs.AI", "cs.LG"],
+        "https://arxiv.org/abs/3": ["cs.LG"],
+    }
+
+
+def test_aiter_recent_listings_yields_each_paper_once():
+    pages = {
+        listing_url(0, 10, "cs.AI"): '<a href="/abs/1">x</a><a href="/abs/2">x</a>',
+        listing_url(0, 10, "cs.CL"): '<a href="/abs/2">x</a>',
+    }
+
+    def handler(request):
+        return httpx.Response(200, text=pages[str(request.url)])
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.create_async_client(transport=transport) as http:
+            return [
+                item
+                async for item in aiter_recent_listings(
+                    ["cs.AI", "cs.CL"], page_size=10, http_client=http
+                )
+            ]
+
+    items = asyncio.run(run())
+    assert sorted(url for url, _ in items) == [
+        "https://arxiv.org/abs/1",
+        "https://arxiv.org/abs/2",
+    ]
+    assert dict(items)["https://arxiv.org/abs/2"] == ["cs.AI", "cs.CL"]
+
+
+def test_aiter_recent_listings_propagates_errors():
+    def handler(request):
+        return httpx.Response(500 if "cs.LG" in str(request.url) else 200, text="")
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.create_async_client(transport=transport) as http:
+            return [
+                item
+                async for item in aiter_recent_listings(
+                    ["cs.AI", "cs.LG"], http_client=http
+                )
+            ]
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
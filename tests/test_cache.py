@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from newsletter import cache
 from pathlib import Path
 from unittest.mock import patch
@@ -27,3 +28,200 @@ def test_set_and_get_paper_roundtrip(tmp_path):
     with patch.dict(os.environ, env):
         cache.set_paper("u", data)
         assert cache.get_paper("u") == data
+
+
+def test_set_paper_persists_across_connections(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u", {"title": "T"})
+    assert cache.flush() == 1
+    cache._conn.close()
+    cache._conn = None
+    assert cache.get_paper("u") == {"title": "T"}
+    assert (tmp_path / "papers.sqlite3").exists()
+
+
+def test_legacy_json_is_imported(tmp_path, monkeypatch):
+    legacy = {"u1": {"title": "A"}, "u2": {"title": "B"}}
+    (tmp_path / "papers.json").write_text(json.dumps(legacy))
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    assert cache.get_paper("u2") == {"title": "B"}
+    assert cache.get_paper("missing") is None
+
+
+def test_update_paper_merges_concurrent_writes(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u", {"title": "T"})
+
+    def worker(i):
+        cache.update_paper("u", {f"field{i}": i})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cache.flush()
+
+    record = cache.get_paper("u")
+    assert record["title"] == "T"
+    assert all(record[f"field{i}"] == i for i in range(20))
+
+
+def test_update_paper_uses_default_for_missing_entry(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.update_paper("u", {"b": 2}, default={"a": 1})
+    assert cache.get_paper("u") == {"a": 1, "b": 2}
+
+
+def test_flush_triggered_by_size_threshold(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "FLUSH_SIZE", 3)
+    for i in range(3):
+        cache.set_paper(f"u{i}", {"i": i})
+    assert cache._dirty == {}
+    count = cache._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+    assert count == 3
+
+
+def test_expired_field_is_dropped(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "_now", lambda: 1000.0)
+    cache.set_paper("u", {"title": "T", "google_results": ["g"]})
+    cache.flush()
+    monkeypatch.setattr(cache, "_now", lambda: 1000.0 + 8 * 24 * 3600)
+    assert cache.get_paper("u") == {"title": "T"}
+    cache.update_paper("u", {"google_results": ["h"]})
+    assert cache.get_paper("u") == {"title": "T", "google_results": ["h"]}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 2)
+    clock = iter(range(100))
+    monkeypatch.setattr(cache, "_now", lambda: float(next(clock)))
+    for url in ("u1", "u2"):
+        cache.set_paper(url, {"title": url})
+        cache.flush()
+    assert cache.get_paper("u1") == {"title": "u1"}
+    cache.set_paper("u3", {"title": "u3"})
+    cache.flush()
+    assert cache.get_paper("u2") is None
+    assert cache.get_paper("u1") == {"title": "u1"}
+    assert cache.get_paper("u3") == {"title": "u3"}
+
+
+def test_eviction_by_size(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "MAX_BYTES", 50)
+    clock = iter(range(100))
+    monkeypatch.setattr(cache, "_now", lambda: float(next(clock)))
+    for i in range(3):
+        cache.set_paper(f"u{i}", {"title": "x" * 20})
+        cache.flush()
+    assert cache.get_paper("u0") is None
+    assert cache.get_paper("u2") is not None
+
+
+def test_negative_entries_expire(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "_now", lambda: 1000.0)
+    assert not cache.is_negative("u")
+    cache.set_negative("u", ttl=60)
+    assert cache.is_negative("u")
+    monkeypatch.setattr(cache, "_now", lambda: 1061.0)
+    assert not cache.is_negative("u")
+
+
+def test_database_without_stamps_is_migrated(tmp_path, monkeypatch):
+    import sqlite3
+
+    conn = sqlite3.connect(tmp_path / "papers.sqlite3")
+    conn.execute("CREATE TABLE papers (url TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    conn.execute(
+        "INSERT INTO papers VALUES (?, ?)", ("u", json.dumps({"google_results": []}))
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    assert cache.get_paper("u") == {"google_results": []}
+
+
+def test_open_does_not_scan_existing_records(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u", {"title": "T"})
+    cache.flush()
+    cache._conn.close()
+    cache._conn = None
+
+    with patch.object(cache, "loads") as decode:
+        conn = cache._connection()
+    assert conn is not None
+    decode.assert_not_called()
+    assert cache.get_paper("u") == {"title": "T"}
+
+
+def test_convert_legacy_json(tmp_path):
+    import convert_cache
+    from newsletter import query
+
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text(
+        json.dumps({"u1": {"title": "Graph nets", "submission_date": "2024-01-01"}})
+    )
+    with patch.dict(os.environ):
+        assert convert_cache.convert(legacy, tmp_path / "cache") == 1
+        assert cache.get_paper("u1")["title"] == "Graph nets"
+        assert query.find_urls(keywords="graph") == ["u1"]
+    assert (tmp_path / "cache" / "papers.sqlite3").exists()
+
+
+def test_convert_in_the_cache_directory_imports_once(tmp_path):
+    import convert_cache
+
+    legacy = tmp_path / "papers.json"
+    legacy.write_text(json.dumps({"u1": {"title": "T"}}))
+    with patch.dict(os.environ), patch.object(
+        cache, "_load_cache", wraps=cache._load_cache
+    ) as load:
+        assert convert_cache.convert(legacy, tmp_path) == 1
+        assert cache.get_paper("u1") == {"title": "T"}
+    assert load.call_count == 1
+
+
+def test_indexes_are_updated_without_the_cache_lock(tmp_path, monkeypatch):
+    from newsletter import query
+
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u1", {"title": "T"})
+    cache.flush()
+    cache.set_paper("u2", {"title": "T"})
+    lookups = []
+
+    def index_records(conn, records):
+        # Another thread can read the cache while the flush is indexed
+        reader = threading.Thread(target=lambda: lookups.append(cache.get_paper("u1")))
+        reader.start()
+        reader.join(timeout=5)
+        return 0
+
+    with patch.object(query, "index_records", side_effect=index_records):
+        cache.flush()
+    assert lookups == [{"title": "T"}]
+
+
+def test_writes_do_not_wait_for_indexing(tmp_path, monkeypatch):
+    from newsletter import query
+
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "FLUSH_SIZE", 1)
+    cache._connection()
+    threads = []
+
+    def index_records(conn, records):
+        threads.append(threading.current_thread())
+        return 0
+
+    with patch.object(query, "index_records", side_effect=index_records):
+        cache.set_paper("u1", {"title": "T"})
+        cache.flush()
+    assert threads and threading.current_thread() not in threads
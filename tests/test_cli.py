@@ -0,0 +1,148 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from newsletter import cache, cli
+
+
+def test_cache_stats(tmp_path, monkeypatch, capsys, make_paper):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u", make_paper("u", 1).to_dict())
+    assert cli.main(["cache", "stats", "--json"]) == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["papers"] == 1
+    assert stats["bytes"] > 0
+
+
+def test_cache_stats_without_cache(monkeypatch, capsys):
+    monkeypatch.delenv("NEWSLETTER_CACHE_DIR", raising=False)
+    assert cli.main(["cache", "stats"]) == 1
+    assert "NEWSLETTER_CACHE_DIR" in capsys.readouterr().err
+
+
+def test_score_rewrites_file_best_first(tmp_path, make_paper):
+    papers = tmp_path / "papers.jsonl"
+    papers.write_text(
+        "".join(
+            json.dumps(make_paper(f"u{i}", hits).to_dict()) + "\n"
+            for i, hits in enumerate([1, 3])
+        )
+    )
+    out = tmp_path / "out.jsonl"
+    assert cli.main(["score", str(papers), "-o", str(out), "--weight", "google=2"]) == 0
+    data = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [d["arxiv_url"] for d in data] == ["u1", "u0"]
+    assert [d["combined_score"] for d in data] == pytest.approx([3.0, 1.0])
+
+
+def test_score_rejects_bad_weights(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(["score", str(tmp_path / "papers.jsonl"), "--weight", "google"])
+
+
+def test_score_rejects_unknown_signals_and_normalizations(tmp_path, capsys, make_paper):
+    papers = tmp_path / "papers.jsonl"
+    papers.write_text(json.dumps(make_paper("u0", 1).to_dict()) + "\n")
+    assert cli.main(["score", str(papers), "--weight", "nosuch=1"]) == 2
+    assert "nosuch" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        cli.main(["score", str(papers), "--normalization", "bogus"])
+
+
+def test_normalization_choices_match_the_scoring_engine():
+    from newsletter import scoring
+
+    assert set(cli.NORMALIZATIONS) == set(scoring.NORMALIZATIONS)
+
+
+def test_score_refuses_to_replace_other_files(tmp_path, capsys, make_paper):
+    papers = tmp_path / "papers.jsonl"
+    papers.write_text(json.dumps(make_paper("u0", 1).to_dict()) + "\n")
+    assert cli.main(["score", str(papers), "-o", str(tmp_path)]) == 2
+    assert "Not a regular file" in capsys.readouterr().err
+    assert tmp_path.is_dir()
+
+
+def test_export_queries_the_cache(tmp_path, monkeypatch, capsys, make_paper):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    for url, day in (("u1", 1), ("u2", 20)):
+        cache.set_paper(url, make_paper(url, 0, day, authors=["Doe, Jane"]).to_dict())
+    u3 = make_paper("u3", 0, 25, authors=["Roe, Rick"], categories=["cs.AI"])
+    cache.set_paper("u3", u3.to_dict())
+
+    assert cli.main(["export", "--author", "Jane Doe", "--since", "2024-01-10"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["arxiv_url"] for line in lines] == ["u2"]
+
+    out = tmp_path / "papers.csv"
+    assert cli.main(["export", "--format", "csv", "-o", str(out)]) == 0
+    rows = out.read_text().splitlines()
+    assert rows[0] == ",".join(cli.EXPORT_COLUMNS)
+    assert rows[1] == 'u3,u3,"Roe, Rick",2024-01-25,cs.AI'
+    assert len(rows) == 4
+
+
+def test_fetch_passes_options_on():
+    with patch("newsletter.pipeline.run") as run:
+        assert cli.main(["fetch", "--incremental", "--batch-size", "5"]) == 0
+    run.assert_called_once_with(["--incremental", "--batch-size", "5"])
+
+
+def test_unknown_options_are_rejected():
+    with pytest.raises(SystemExit):
+        cli.main(["cache", "stats", "--bogus"])
+
+
+def test_cache_stats_does_not_import_heavy_dependencies(tmp_path):
+    code = (
+        "import sys\n"
+        "from newsletter import cli\n"
+        "cli.main(['cache', 'stats'])\n"
+        "heavy = {'numpy', 'bs4', 'httpx', 'requests', 'newsletter.paper'}\n"
+        "assert not heavy & sys.modules.keys(), heavy & sys.modules.keys()\n"
+    )
+    env = {**os.environ, "NEWSLETTER_CACHE_DIR": str(tmp_path)}
+    root = Path(__file__).resolve().parent.parent
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_score_and_export_do_not_import_network_dependencies(tmp_path, make_paper):
+    papers = tmp_path / "papers.jsonl"
+    papers.write_text(json.dumps(make_paper("u1", 2).to_dict()) + "\n")
+    code = (
+        "import sys\n"
+        "from newsletter import cli\n"
+        f"cli.main(['export', '-o', {str(tmp_path / 'out.jsonl')!r}])\n"
+        "heavy = {'numpy', 'bs4', 'httpx', 'requests', 'googlesearch'}\n"
+        "assert not heavy & sys.modules.keys(), heavy & sys.modules.keys()\n"
+        f"cli.main(['score', {str(papers)!r}])\n"
+        "heavy.discard('numpy')\n"
+        "assert not heavy & sys.modules.keys(), heavy & sys.modules.keys()\n"
+    )
+    env = {**os.environ, "NEWSLETTER_CACHE_DIR": str(tmp_path)}
+    root = Path(__file__).resolve().parent.parent
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize("module", ["fulltext", "dedup", "query", "cache"])
+def test_index_modules_import_first(module):
+    # The package imports lazily, so each module must import on its own
+    root = Path(__file__).resolve().parent.parent
+    result = subprocess.run(
+        [sys.executable, "-c", f"import newsletter.{module}"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
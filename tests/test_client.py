@@ -0,0 +1,55 @@
+from unittest.mock import Mock
+
+import pytest
+
+from newsletter import client
+
+
+@pytest.fixture(autouse=True)
+def reset_session():
+    client.set_session(None)
+    yield
+    client.set_session(None)
+
+
+def test_create_session_configures_pool_and_headers():
+    session = client.create_session(pool_size=4, retries=2, headers={"X": "1"})
+    adapter = session.get_adapter("https://arxiv.org")
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert session.headers["X"] == "1"
+
+
+def test_create_session_defaults_request_gzip():
+    session = client.create_session()
+    assert "gzip" in session.headers["Accept-Encoding"]
+    assert session.headers["User-Agent"] == client.HEADERS["User-Agent"]
+
+
+def test_get_session_is_shared():
+    assert client.get_session() is client.get_session()
+
+
+def test_get_uses_injected_session():
+    session = Mock()
+    client.get("http://example.com", session=session, timeout=3)
+    session.get.assert_called_once_with("http://example.com", timeout=3)
+
+
+def test_set_session_replaces_shared_session(monkeypatch):
+    session = Mock()
+    client.set_session(session)
+    monkeypatch.setattr(client, "TIMEOUT", 5)
+    client.get("http://example.com")
+    session.get.assert_called_once_with("http://example.com", timeout=5)
+
+
+def test_validators_and_conditional_headers_roundtrip():
+    response = Mock(headers={"ETag": '"x"', "Last-Modified": "yesterday"})
+    found = client.validators(response)
+    assert found == {"etag": '"x"', "last_modified": "yesterday"}
+    assert client.conditional_headers(found) == {
+        "If-None-Match": '"x"',
+        "If-Modified-Since": "yesterday",
+    }
+    assert client.conditional_headers(None) == {}
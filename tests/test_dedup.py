@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+import numpy as np
+
+from newsletter import cache, dedup
+
+ABSTRACT = (
+    "We propose a method for learning sparse attention patterns in large "
+    "language models that reduces memory use while keeping accuracy on "
+    "long document benchmarks."
+)
+
+
+def test_signature_is_deterministic_and_estimates_jaccard():
+    a = dedup.signature("Sparse attention", ABSTRACT)
+    assert a.shape == (dedup.NUM_PERM,)
+    assert np.array_equal(a, dedup.signature("Sparse attention", ABSTRACT))
+    assert dedup.similarity(a, a) == 1.0
+    other = dedup.signature("Protein folding", "Predicting protein structure.")
+    assert dedup.similarity(a, other) < 0.2
+    assert dedup.signature("", "the of") is None
+
+
+def test_text_of_exactly_one_shingle_is_shingled():
+    # Three words form one shingle, so their order matters
+    words = ["alpha", "beta", "gamma"]
+    forward = dedup.signature(" ".join(words))
+    backward = dedup.signature(" ".join(reversed(words)))
+    assert dedup.similarity(forward, backward) < 0.5
+
+
+def test_find_duplicate_detects_variants(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u1", {"title": "Sparse attention", "abstract": ABSTRACT})
+    cache.set_paper("u2", {"title": "Protein folding", "abstract": "Proteins."})
+    cache.flush()
+    variant = ABSTRACT.replace("benchmarks.", "benchmarks and code.")
+    assert dedup.find_duplicate("Sparse attention", variant) == "u1"
+    assert dedup.find_duplicate("Sparse attention", ABSTRACT, exclude="u1") is None
+    assert dedup.find_duplicate("Dense retrieval", "Retrieval with vectors.") is None
+
+
+def test_changed_and_evicted_papers_leave_the_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    clock = iter(range(100))
+    monkeypatch.setattr(cache, "_now", lambda: float(next(clock)))
+    cache.set_paper("u1", {"title": "Sparse attention", "abstract": ABSTRACT})
+    cache.flush()
+    cache.update_paper("u1", {"abstract": "Something else entirely."})
+    cache.flush()
+    assert dedup.find_duplicate("Sparse attention", ABSTRACT) is None
+
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 1)
+    cache.set_paper("u2", {"title": "Sparse attention", "abstract": ABSTRACT})
+    cache.set_paper("u3", {"title": "Protein folding", "abstract": "Proteins."})
+    cache.flush()
+    assert dedup.find_duplicate("Sparse attention", ABSTRACT) is None
+    (count,) = cache._conn.execute("SELECT COUNT(*) FROM dedup_signatures").fetchone()
+    assert count == 1
+
+
+def test_existing_cache_gets_signatures_on_open(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u1", {"title": "Sparse attention", "abstract": ABSTRACT})
+    cache.flush()
+    cache._conn.execute("DELETE FROM dedup_signatures")
+    cache._conn.execute("DELETE FROM dedup_bands")
+    cache._conn.execute("DELETE FROM indexes WHERE name = 'newsletter.dedup'")
+    cache._conn.close()
+    cache._conn = None
+    assert dedup.find_duplicate("Sparse attention", ABSTRACT) == "u1"
+
+
+def test_unchanged_text_is_not_hashed_again(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    cache.set_paper("u1", {"title": "Sparse attention", "abstract": ABSTRACT})
+    cache.flush()
+    with patch.object(dedup, "signature", wraps=dedup.signature) as sig:
+        cache.update_paper("u1", {"google_results": ["g1"]})
+        cache.flush()
+    sig.assert_not_called()
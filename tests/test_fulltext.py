@@ -0,0 +1,98 @@
+from datetime import date
+
+from newsletter import cache, fulltext, scoring
+from newsletter.paper import Paper
+
+CORPUS = {
+    "u1": {"title": "Graph neural networks", "abstract": "Message passing on graphs."},
+    "u2": {"title": "Graph transformers", "abstract": "Attention over graph nodes."},
+    "u3": {"title": "Protein folding", "abstract": "Predicting protein structure."},
+}
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert fulltext.tokenize("On the Graph-Neural networks of 2024!") == [
+        "graph",
+        "neural",
+        "networks",
+        "2024",
+    ]
+
+
+def test_search_ranks_matching_papers(fill_cache):
+    fill_cache(CORPUS)
+    results = fulltext.search("graph message passing")
+    assert [url for url, _ in results] == ["u1", "u2"]
+    assert results[0][1] > results[1][1] > 0
+    assert fulltext.search("unrelated") == []
+
+
+def test_search_without_cache_dir(monkeypatch):
+    monkeypatch.delenv("NEWSLETTER_CACHE_DIR", raising=False)
+    assert fulltext.search("graph") == []
+    assert fulltext.related_density("graph") == 0.0
+
+
+def test_changed_records_are_reindexed(fill_cache):
+    fill_cache(CORPUS)
+    cache.update_paper("u3", {"title": "Graph protein folding"})
+    assert "u3" in dict(fulltext.search("graph"))
+    cache.update_paper("u1", {"title": "Message passing"})
+    assert "u1" not in dict(fulltext.search("neural"))
+    docs, length = cache._conn.execute(
+        "SELECT docs, length FROM fulltext_stats"
+    ).fetchone()
+    assert docs == 3
+    assert length == sum(
+        len(fulltext.tokenize(fulltext._document(cache.get_paper(url))))
+        for url in CORPUS
+    )
+
+
+def test_evicted_papers_leave_the_index(monkeypatch, fill_cache):
+    clock = iter(range(100))
+    monkeypatch.setattr(cache, "_now", lambda: float(next(clock)))
+    fill_cache(CORPUS)
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 2)
+    cache.get_paper("u2")
+    cache.get_paper("u3")
+    cache.flush()
+    assert cache.get_paper("u1") is None
+    assert dict(fulltext.search("graph")).keys() == {"u2"}
+
+
+def test_existing_cache_is_indexed_on_open(fill_cache):
+    fill_cache(CORPUS)
+    for table in ("fulltext_docs", "fulltext_postings", "fulltext_terms"):
+        cache._conn.execute(f"DELETE FROM {table}")
+    cache._conn.execute("UPDATE fulltext_stats SET docs = 0, length = 0")
+    cache._conn.commit()
+    cache._conn.execute("DELETE FROM indexes WHERE name = 'newsletter.fulltext'")
+    cache._conn.close()
+    cache._conn = None
+    assert [url for url, _ in fulltext.search("protein")] == ["u3"]
+
+
+def test_related_density_excludes_the_paper_itself(fill_cache):
+    fill_cache(CORPUS)
+    alone = fulltext.related_density("Protein folding", exclude="u3")
+    crowded = fulltext.related_density("Graph transformers", exclude="u2")
+    assert alone == 0.0
+    assert crowded > 0.0
+
+
+def test_related_scoring_signal(fill_cache):
+    fill_cache(CORPUS)
+    papers = [
+        Paper(
+            arxiv_url=url,
+            title=record["title"],
+            abstract=record["abstract"],
+            authors=[],
+            submission_date=date(2024, 1, 1),
+        )
+        for url, record in CORPUS.items()
+    ]
+    values = scoring.signal_matrix(papers, ["related"])[0]
+    assert values[0] > 0 and values[1] > 0
+    assert values[2] == 0.0
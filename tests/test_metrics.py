@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from newsletter import metrics
+
+
+def test_counters_and_ratios():
+    metrics.increment("cache_hits", 3)
+    metrics.increment("cache_misses")
+    summary = metrics.snapshot()
+    assert summary["counters"] == {"cache_hits": 3, "cache_misses": 1}
+    assert summary["ratios"] == {"cache_hit_rate": 0.75}
+
+
+def test_timer_records_failed_blocks():
+    with pytest.raises(RuntimeError):
+        with metrics.timer("stage_seconds"):
+            raise RuntimeError
+    with metrics.timer("stage_seconds"):
+        pass
+    stats = metrics.snapshot()["histograms"]["stage_seconds"]
+    assert stats["count"] == 2
+    assert 0 <= stats["min"] <= stats["max"]
+
+
+def test_write_json_and_prometheus(tmp_path):
+    metrics.increment("papers_written", 2)
+    metrics.observe("abs_fetch_seconds", 0.02)
+    metrics.observe("abs_fetch_seconds", 3.0)
+
+    metrics.write_json(tmp_path / "m.json")
+    data = json.loads((tmp_path / "m.json").read_text())
+    assert data["histograms"]["abs_fetch_seconds"]["sum"] == pytest.approx(3.02)
+
+    metrics.write_prometheus(tmp_path / "m.prom")
+    text = (tmp_path / "m.prom").read_text()
+    assert "newsletter_papers_written_total 2\n" in text
+    assert 'newsletter_abs_fetch_seconds_bucket{le="0.025"} 1\n' in text
+    assert 'newsletter_abs_fetch_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "newsletter_abs_fetch_seconds_count 2\n" in text
+    assert not (tmp_path / "m.prom.tmp").exists()
+
+
+def test_reset():
+    metrics.increment("x")
+    metrics.reset()
+    assert metrics.snapshot() == {"counters": {}, "histograms": {}, "ratios": {}}
@@ -1,11 +1,14 @@
+import asyncio
 from datetime import date
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 import os
 
+import httpx
 import pytest
 
-from newsletter.paper import Paper
+from newsletter import client
 
+from newsletter.paper import Paper
 
 HTML_PAGE = """\
 <!DOCTYPE html>
@@ -41,12 +44,12 @@ def test_create_paper():
     assert paper.google_results is None
 
 
-def test_from_url_parses_paper_metadata():
-    with patch("newsletter.paper.requests.get") as mock_get:
-        mock_get.return_value.text = HTML_PAGE
-        mock_get.return_value.raise_for_status = lambda: None
-        paper = Paper.from_url("http://arxiv.org/abs/1234.5678")
-        mock_get.assert_called_once_with("http://arxiv.org/abs/1234.5678", timeout=10)
+def test_from_url_parses_paper_metadata(mock_session):
+    session = mock_session(HTML_PAGE)
+    paper = Paper.from_url("http://arxiv.org/abs/1234.5678", session=session)
+    session.get.assert_called_once_with(
+        "http://arxiv.org/abs/1234.5678", timeout=10, headers={}
+    )
 
     assert (
         paper.title
@@ -68,7 +71,40 @@ def test_from_url_parses_paper_metadata():
     assert paper.submission_date == date(2025, 5, 22)
 
 
-def test_from_url_missing_date_defaults_to_epoch():
+def test_afrom_url_parses_paper_metadata():
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        return httpx.Response(200, text=HTML_PAGE)
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.create_async_client(transport=transport) as http:
+            return await Paper.afrom_url(
+                "http://arxiv.org/abs/1234.5678", http_client=http
+            )
+
+    paper = asyncio.run(run())
+    assert requested == ["http://arxiv.org/abs/1234.5678"]
+    assert paper.title.startswith("X-MAS")
+    assert len(paper.authors) == 7
+    assert paper.submission_date == date(2025, 5, 22)
+
+
+def test_from_html_falls_back_when_meta_outside_head():
+    html = """<html><head></head><body>
+<meta name="citation_title" content="Body Title" />
+<meta name="citation_author" content="Author" />
+<meta name="citation_date" content="2024/02/03" />
+</body></html>"""
+    paper = Paper.from_html("http://arxiv.org/abs/0000.0001", html)
+    assert paper.title == "Body Title"
+    assert paper.authors == ["Author"]
+    assert paper.submission_date == date(2024, 2, 3)
+
+
+def test_from_url_missing_date_defaults_to_epoch(mock_session):
     html = """\
 <!DOCTYPE html>
 <html>
@@ -81,16 +117,13 @@ def test_from_url_missing_date_defaults_to_epoch():
 </html>
 """
 
-    with patch("newsletter.paper.requests.get") as mock_get:
-        mock_get.return_value.text = html
-        mock_get.return_value.raise_for_status = lambda: None
-        paper = Paper.from_url("http://arxiv.org/abs/0000.0000")
+    paper = Paper.from_url("http://arxiv.org/abs/0000.0000", session=mock_session(html))
 
     assert paper.submission_date == date(1970, 1, 1)
     assert paper.authors == ["Author"]
 
 
-def test_from_url_invalid_date_uses_today():
+def test_from_url_invalid_date_uses_today(mock_session):
     today = date.today()
     html = """\
 <!DOCTYPE html>
@@ -105,15 +138,12 @@ def test_from_url_invalid_date_uses_today():
 </html>
 """
 
-    with patch("newsletter.paper.requests.get") as mock_get:
-        mock_get.return_value.text = html
-        mock_get.return_value.raise_for_status = lambda: None
-        paper = Paper.from_url("http://arxiv.org/abs/0000.0000")
+    paper = Paper.from_url("http://arxiv.org/abs/0000.0000", session=mock_session(html))
 
     assert paper.submission_date == today
 
 
-def test_from_url_invalid_date_uses_patched_today():
+def test_from_url_invalid_date_uses_patched_today(mock_session):
     fallback = date(1999, 12, 31)
 
     class FakeDate(date):
@@ -134,12 +164,10 @@ def test_from_url_invalid_date_uses_patched_today():
 </html>
 """
 
-    with patch("newsletter.paper.requests.get") as mock_get, patch(
-        "newsletter.paper.date", FakeDate
-    ):
-        mock_get.return_value.text = html
-        mock_get.return_value.raise_for_status = lambda: None
-        paper = Paper.from_url("http://arxiv.org/abs/0000.0000")
+    with patch("newsletter.paper.date", FakeDate):
+        paper = Paper.from_url(
+            "http://arxiv.org/abs/0000.0000", session=mock_session(html)
+        )
 
     assert paper.submission_date == fallback
 
@@ -193,29 +221,27 @@ def test_compute_combined_scores():
     assert pytest.approx(p2.combined_score) == expected_p2
 
 
-def test_from_url_caches(tmp_path):
+def test_from_url_caches(tmp_path, mock_session):
     url = "http://arxiv.org/abs/1234.5678"
     env = {"NEWSLETTER_CACHE_DIR": str(tmp_path)}
     with patch.dict(os.environ, env):
-        with patch("newsletter.paper.requests.get") as mock_get:
-            mock_get.return_value.text = HTML_PAGE
-            mock_get.return_value.raise_for_status = lambda: None
-            Paper.from_url(url)
-            mock_get.assert_called_once()
+        session = mock_session(HTML_PAGE)
+        Paper.from_url(url, session=session)
+        session.get.assert_called_once()
 
     with patch.dict(os.environ, env):
-        with patch("newsletter.paper.requests.get") as mock_get:
-            Paper.from_url(url)
-            mock_get.assert_not_called()
+        session = Mock()
+        Paper.from_url(url, session=session)
+        session.get.assert_not_called()
 
 
 def test_search_caches(tmp_path):
     env = {"NEWSLETTER_CACHE_DIR": str(tmp_path)}
     paper = Paper(
-        arxiv_url="http://arxiv.org/abs/cache", 
-        title="Cache Test", 
-        abstract="", 
-        authors=[], 
+        arxiv_url="http://arxiv.org/abs/cache",
+        title="Cache Test",
+        abstract="",
+        authors=[],
         submission_date=date(2024, 1, 1),
     )
 
@@ -229,3 +255,129 @@ def test_search_caches(tmp_path):
             assert paper.query_google() == ["g1"]
             m_g2.assert_not_called()
 
+
+def test_from_ids_uses_export_api_and_falls_back(
+    tmp_path, monkeypatch, atom_feed, mock_response
+):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    session = Mock()
+    session.get.side_effect = [mock_response(atom_feed), mock_response(HTML_PAGE)]
+
+    papers = Paper.from_ids(
+        ["2401.00001", "https://arxiv.org/abs/9999.99999"], session=session
+    )
+
+    assert [p.arxiv_url for p in papers] == [
+        "https://arxiv.org/abs/2401.00001",
+        "https://arxiv.org/abs/9999.99999",
+    ]
+    assert papers[0].title == "A Study of Things"
+    assert papers[0].authors == ["Alice Smith", "Bob Jones"]
+    assert papers[0].submission_date == date(2024, 1, 1)
+    assert papers[1].title.startswith("X-MAS")
+    assert session.get.call_count == 2
+
+    session.get.reset_mock()
+    again = Paper.from_ids(["2401.00001"], session=session)
+    assert again[0].title == "A Study of Things"
+    session.get.assert_not_called()
+
+
+def test_from_ids_reports_failed_fallbacks_per_paper(
+    tmp_path, monkeypatch, atom_feed, mock_response
+):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+
+    def get(url, **kwargs):
+        if "9999.99999" in url:
+            raise RuntimeError("abs page down")
+        return mock_response(HTML_PAGE if "8888.88888" in url else atom_feed)
+
+    session = Mock()
+    session.get.side_effect = get
+    failed = []
+    ids = ["2401.00001", "9999.99999", "8888.88888"]
+
+    papers = Paper.from_ids(
+        ids, session=session, on_error=lambda url, exc: failed.append(url)
+    )
+
+    assert [p.arxiv_url for p in papers] == [
+        "https://arxiv.org/abs/2401.00001",
+        "https://arxiv.org/abs/8888.88888",
+    ]
+    assert failed == ["https://arxiv.org/abs/9999.99999"]
+    with pytest.raises(RuntimeError):
+        Paper.from_ids(ids, session=session)
+
+
+def test_from_url_refresh_revalidates_with_validators(
+    tmp_path, monkeypatch, mock_response
+):
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    url = "http://arxiv.org/abs/1234.5678"
+    session = Mock()
+    session.get.return_value = mock_response(
+        HTML_PAGE, headers={"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024"}
+    )
+    Paper.from_url(url, session=session)
+
+    paper = Paper(
+        arxiv_url=url,
+        title="",
+        abstract="",
+        authors=[],
+        submission_date=date(2024, 1, 1),
+    )
+    with patch("newsletter.paper.google_search", return_value=["g1"]):
+        paper.query_google()
+
+    session.get.reset_mock()
+    session.get.return_value = mock_response("", status_code=304)
+    refreshed = Paper.from_url(url, session=session, refresh=True)
+
+    session.get.assert_called_once_with(
+        url,
+        timeout=10,
+        headers={"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jan 2024"},
+    )
+    assert refreshed.title.startswith("X-MAS")
+    assert refreshed.google_results == ["g1"]
+
+
+def test_query_google_failure_is_not_cached(tmp_path, monkeypatch):
+    from requests.exceptions import HTTPError
+
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    paper = Paper(
+        arxiv_url="http://arxiv.org/abs/fail",
+        title="Throttled",
+        abstract="",
+        authors=[],
+        submission_date=date(2024, 1, 1),
+    )
+    error = HTTPError("429", response=Mock(status_code=429, headers={}))
+    with patch("newsletter.paper.google_search", side_effect=error) as m_g:
+        assert paper.query_google() == []
+    assert m_g.call_count > 1
+    assert paper.google_results is None
+
+    with patch("newsletter.paper.google_search", return_value=["g1"]) as m_g2:
+        assert paper.query_google() == ["g1"]
+        m_g2.assert_called_once()
+
+
+def test_from_url_remembers_missing_page(tmp_path, monkeypatch, mock_response):
+    from requests.exceptions import HTTPError
+
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    url = "http://arxiv.org/abs/0000.0000"
+    response = mock_response("", status_code=404)
+    response.raise_for_status = Mock(side_effect=HTTPError("404"))
+    session = Mock()
+    session.get.return_value = response
+    with pytest.raises(HTTPError):
+        Paper.from_url(url, session=session)
+    with pytest.raises(LookupError):
+        Paper.from_url(url, session=session)
+    session.get.assert_called_once()
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import date
+
+import httpx
+
+from newsletter import client, metrics
+from newsletter.paper import Paper
+from newsletter.parsing import ParserPool, parse_abs_pages
+
+
+def test_parse_abs_pages_reports_timings(abs_page):
+    [(fields, seconds, fallback)] = parse_abs_pages([abs_page("T")])
+    assert fields == {
+        "title": "T",
+        "abstract": "",
+        "authors": ["Doe, J."],
+        "submission_date": date(2024, 2, 3),
+    }
+    assert seconds >= 0
+    assert not fallback
+
+
+def test_parse_abs_pages_returns_errors_per_page(abs_page):
+    ok, failed = parse_abs_pages([abs_page("T"), None])
+    assert ok[0]["title"] == "T"
+    assert isinstance(failed, Exception)
+
+
+def test_parser_pool_parses_in_batches(abs_page):
+    async def run():
+        with ParserPool(2, batch_size=2) as pool:
+            return await asyncio.gather(
+                *(pool.parse(abs_page(f"T{i}")) for i in range(5))
+            )
+
+    results = asyncio.run(run())
+    assert [r["title"] for r in results] == [f"T{i}" for i in range(5)]
+    assert metrics.snapshot()["histograms"]["abs_parse_seconds"]["count"] == 5
+
+
+def test_afrom_url_uses_parser_pool(abs_page):
+    def handler(request):
+        return httpx.Response(200, text=abs_page("Pooled"))
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        with ParserPool(1) as pool:
+            async with client.create_async_client(transport=transport) as http:
+                return await Paper.afrom_url(
+                    "http://arxiv.org/abs/1234.5678", http_client=http, parser=pool
+                )
+
+    paper = asyncio.run(run())
+    assert paper.title == "Pooled"
+    assert paper.authors == ["Doe, J."]
+
+
+def test_parser_pool_isolates_errors_and_counts_fallbacks(abs_page):
+    async def run():
+        with ParserPool(1, batch_size=3) as pool:
+            return await asyncio.gather(
+                pool.parse(abs_page("T")),
+                pool.parse(None),
+                pool.parse("<html><body><h1>No meta</h1></body></html>"),
+                return_exceptions=True,
+            )
+
+    ok, failed, fallback = asyncio.run(run())
+    assert ok["title"] == "T"
+    assert isinstance(failed, Exception)
+    assert fallback["title"] == ""
+    assert metrics.snapshot()["counters"]["abs_parse_fallbacks"] == 1
@@ -0,0 +1,469 @@
+import asyncio
+import json
+import time
+from datetime import date
+from unittest.mock import ANY, patch
+
+from pathlib import Path
+
+import pytest
+
+from newsletter import pipeline
+from newsletter.paper import Paper
+
+
+def _noop(*args, **kwargs):
+    return []
+
+
+def _listing(urls, categories=("cs.AI",)):
+    """Return a stand-in for ``aiter_recent_listings`` yielding ``urls``."""
+
+    async def fake(*args, **kwargs):
+        for url in urls:
+            yield url, list(categories)
+
+    return fake
+
+
+def test_main_sorts_by_score(tmp_path):
+    out = tmp_path / "out.jsonl"
+
+    p1 = Paper(
+        arxiv_url="u1",
+        title="p1",
+        abstract="",
+        authors=[],
+        submission_date=date(2023, 1, 1),
+    )
+    p2 = Paper(
+        arxiv_url="u2",
+        title="p2",
+        abstract="",
+        authors=[],
+        submission_date=date(2023, 1, 1),
+    )
+    p1.google_results = ["g1"]
+    p2.google_results = ["g1", "g2", "g3"]
+
+    with patch.object(pipeline, "OUTPUT_FILE", str(out)), patch.object(
+        pipeline, "aiter_recent_listings", _listing(["u1", "u2"])
+    ), patch("newsletter.pipeline.Paper.afrom_url", side_effect=[p1, p2]), patch(
+        "newsletter.pipeline.Paper.query_google", _noop
+    ):
+        asyncio.run(pipeline.main())
+
+    lines = out.read_text().splitlines()
+    assert len(lines) == 2
+    first = json.loads(lines[0])
+    assert first["arxiv_url"] == "u2"
+    assert first["categories"] == ["cs.AI"]
+
+
+def test_main_writes_jsonl(tmp_path: Path):
+    outfile = tmp_path / "out.jsonl"
+
+    sample = Paper(
+        arxiv_url="url1",
+        title="Title",
+        abstract="Abst",
+        authors=["A"],
+        submission_date=date(2024, 1, 1),
+    )
+
+    with patch("newsletter.pipeline.OUTPUT_FILE", str(outfile)), patch(
+        "newsletter.pipeline.aiter_recent_listings", _listing(["url1"])
+    ), patch(
+        "newsletter.pipeline.Paper.afrom_url", return_value=sample
+    ) as mock_from, patch(
+        "newsletter.pipeline.Paper.query_google", _noop
+    ):
+        asyncio.run(pipeline.main())
+
+    mock_from.assert_called_once_with(
+        "url1", http_client=ANY, refresh=False, parser=ANY
+    )
+
+    data = [json.loads(line) for line in outfile.read_text().splitlines()]
+    assert data == [
+        {
+            "arxiv_url": "url1",
+            "title": "Title",
+            "abstract": "Abst",
+            "authors": ["A"],
+            "submission_date": "2024-01-01",
+            "google_results": None,
+            "categories": ["cs.AI"],
+            "combined_score": 0.0,
+        }
+    ]
+
+    summary = json.loads((tmp_path / "out.jsonl.metrics.json").read_text())
+    assert summary["counters"]["papers_written"] == 1
+    assert "run_seconds" in summary["histograms"]
+
+
+def test_parse_args_concurrency():
+    args = pipeline.parse_args(
+        ["--arxiv-concurrency", "4", "--search-concurrency", "1"]
+    )
+    assert args.arxiv_concurrency == 4
+    assert args.search_concurrency == 1
+
+
+def test_main_batch_mode_uses_from_ids(tmp_path):
+    out = tmp_path / "out.jsonl"
+    sample = Paper(
+        arxiv_url="u1",
+        title="t",
+        abstract="",
+        authors=[],
+        submission_date=date(2024, 1, 1),
+    )
+
+    with patch.object(pipeline, "aiter_recent_listings", _listing(["u1"])), patch(
+        "newsletter.pipeline.Paper.from_ids", return_value=[sample]
+    ) as mock_ids, patch("newsletter.pipeline.Paper.afrom_url") as mock_from, patch(
+        "newsletter.pipeline.Paper.query_google", _noop
+    ):
+        asyncio.run(pipeline.main(str(out), batch_size=50))
+
+    mock_ids.assert_called_once_with(["u1"], batch_size=50, refresh=False, on_error=ANY)
+    mock_from.assert_not_called()
+    assert json.loads(out.read_text())["arxiv_url"] == "u1"
+
+
+def test_main_incremental_fetches_only_new_papers(tmp_path):
+    out = tmp_path / "out.jsonl"
+
+    def make(url, results):
+        paper = Paper(
+            arxiv_url=url,
+            title=url,
+            abstract="",
+            authors=[],
+            submission_date=date(2024, 1, 1),
+        )
+        paper.google_results = results
+        return paper
+
+    old = make("https://arxiv.org/abs/1", ["g1", "g2", "g3"])
+    with patch.object(
+        pipeline, "aiter_recent_listings", _listing([old.arxiv_url])
+    ), patch("newsletter.pipeline.Paper.afrom_url", return_value=old), patch(
+        "newsletter.pipeline.Paper.query_google", _noop
+    ):
+        asyncio.run(pipeline.main(str(out)))
+
+    new = make("https://arxiv.org/abs/2", ["g1"])
+    urls = ["https://arxiv.org/abs/1", "https://arxiv.org/abs/2"]
+    with patch.object(pipeline, "aiter_recent_listings", _listing(urls)), patch(
+        "newsletter.pipeline.Paper.afrom_url", return_value=new
+    ) as mock_from, patch("newsletter.pipeline.Paper.query_google") as mock_google:
+        asyncio.run(pipeline.main(str(out), incremental=True))
+
+    mock_from.assert_called_once_with(
+        urls[1], http_client=ANY, refresh=False, parser=ANY
+    )
+    mock_google.assert_called_once()
+    data = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [d["arxiv_url"] for d in data] == urls
+    assert data[0]["google_results"] == ["g1", "g2", "g3"]
+    manifest = json.loads((tmp_path / "out.jsonl.manifest.json").read_text())
+    assert sorted(manifest["ids"]) == ["1", "2"]
+
+
+def test_load_previous_papers_requires_manifest(tmp_path):
+    out = tmp_path / "out.jsonl"
+    out.write_text(
+        json.dumps(
+            {
+                "arxiv_url": "https://arxiv.org/abs/1",
+                "title": "t",
+                "abstract": "",
+                "authors": [],
+                "submission_date": "2024-01-01",
+                "google_results": [],
+            }
+        )
+        + "\n"
+    )
+    manifest = tmp_path / "out.jsonl.manifest.json"
+    assert pipeline.load_previous_papers(str(out), str(manifest)) == {}
+
+    manifest.write_text(json.dumps({"ids": ["1"]}))
+    papers = pipeline.load_previous_papers(str(out), str(manifest))
+    assert list(papers) == ["1"]
+    assert papers["1"].submission_date == date(2024, 1, 1)
+
+
+def test_load_previous_papers_skips_truncated_line(tmp_path, make_paper):
+    out = tmp_path / "out.jsonl"
+    paper = make_paper("https://arxiv.org/abs/1")
+    out.write_text(json.dumps(paper.to_dict()) + "\n" + '{"arxiv_url": "https://ar')
+    manifest = tmp_path / "out.jsonl.manifest.json"
+    manifest.write_text(json.dumps({"ids": ["1", "2"]}))
+    previous = pipeline.load_previous_papers(str(out), str(manifest))
+    assert list(previous) == ["1"]
+
+
+def test_main_starts_fetching_before_listing_finishes(tmp_path):
+    events = []
+
+    async def slow_listing(*args, **kwargs):
+        yield "u1", ["cs.AI"]
+        await asyncio.sleep(0.05)
+        events.append("listing done")
+        yield "u2", ["cs.AI"]
+
+    async def fake_afrom_url(url, http_client=None, refresh=False, parser=None):
+        events.append(f"fetch {url}")
+        return Paper(
+            arxiv_url=url,
+            title=url,
+            abstract="",
+            authors=[],
+            submission_date=date(2024, 1, 1),
+        )
+
+    with patch.object(pipeline, "aiter_recent_listings", slow_listing), patch(
+        "newsletter.pipeline.Paper.afrom_url", side_effect=fake_afrom_url
+    ), patch("newsletter.pipeline.Paper.query_google", _noop):
+        asyncio.run(pipeline.main(str(tmp_path / "out.jsonl")))
+
+    assert events == ["fetch u1", "listing done", "fetch u2"]
+
+
+def test_parse_args_categories():
+    assert pipeline.parse_args([]).categories is None
+    args = pipeline.parse_args(["--category", "cs.LG", "--category", "cs.CL"])
+    assert args.categories == ["cs.LG", "cs.CL"]
+
+
+def test_slow_search_does_not_block_fetching(tmp_path):
+    events = []
+
+    async def fake_afrom_url(url, http_client=None, refresh=False, parser=None):
+        events.append(f"fetch {url}")
+        return Paper(
+            arxiv_url=url,
+            title=url,
+            abstract="",
+            authors=[],
+            submission_date=date(2024, 1, 1),
+        )
+
+    def slow_search(self, num_results=10):
+        time.sleep(0.02)
+        events.append(f"search {self.arxiv_url}")
+        return []
+
+    urls = [f"u{i}" for i in range(4)]
+    with patch.object(pipeline, "aiter_recent_listings", _listing(urls)), patch(
+        "newsletter.pipeline.Paper.afrom_url", side_effect=fake_afrom_url
+    ), patch("newsletter.pipeline.Paper.query_google", slow_search):
+        asyncio.run(
+            pipeline.main(
+                str(tmp_path / "out.jsonl"), search_concurrency=1, queue_size=2
+            )
+        )
+
+    assert events.index("fetch u3") < events.index("search u1")
+    assert not (tmp_path / "out.jsonl.partial").exists()
+
+
+def test_failed_papers_do_not_stop_the_run(tmp_path, make_paper):
+    out = tmp_path / "out.jsonl"
+
+    async def fake_afrom_url(url, **kwargs):
+        if url == "u1":
+            raise RuntimeError("boom")
+        return make_paper(url)
+
+    def search(self, num_results=10):
+        if self.arxiv_url == "u2":
+            raise RuntimeError("search down")
+        self.google_results = []
+
+    with patch.object(
+        pipeline, "aiter_recent_listings", _listing(["u1", "u2", "u3"])
+    ), patch("newsletter.pipeline.Paper.afrom_url", side_effect=fake_afrom_url), patch(
+        "newsletter.pipeline.Paper.query_google", search
+    ):
+        asyncio.run(pipeline.main(str(out)))
+
+    lines = out.read_text().splitlines()
+    assert [json.loads(line)["arxiv_url"] for line in lines] == ["u3"]
+    summary = json.loads((tmp_path / "out.jsonl.metrics.json").read_text())
+    assert summary["counters"]["papers_failed"] == 2
+    assert not (tmp_path / "out.jsonl.journal").exists()
+
+
+def test_failed_fallback_leaves_only_its_paper_out_of_a_batch(tmp_path, make_paper):
+    out = tmp_path / "out.jsonl"
+    journal, refreshed = [], []
+
+    def from_ids(urls, *, on_error, refresh, **kwargs):
+        refreshed.append(refresh)
+        on_error("u2", RuntimeError("abs page down"))
+        return [make_paper(url) for url in urls if url != "u2"]
+
+    def record_failed(self, url, stage, exc):
+        journal.append((url, stage))
+
+    with patch.object(
+        pipeline, "aiter_recent_listings", _listing(["u1", "u2", "u3"])
+    ), patch("newsletter.pipeline.Paper.from_ids", side_effect=from_ids), patch(
+        "newsletter.pipeline.Paper.query_google", _noop
+    ), patch.object(
+        pipeline.RunJournal, "record_failed", record_failed
+    ):
+        asyncio.run(pipeline.main(str(out), batch_size=10, refresh=True))
+
+    lines = out.read_text().splitlines()
+    assert sorted(json.loads(line)["arxiv_url"] for line in lines) == ["u1", "u3"]
+    assert journal == [("u2", "fetch")]
+    assert refreshed == [True]
+
+
+def test_listing_failure_keeps_the_journal(tmp_path, make_paper):
+    async def failing_listing(*args, **kwargs):
+        yield "u1", ["cs.AI"]
+        raise RuntimeError("listing down")
+
+    with patch.object(pipeline, "aiter_recent_listings", failing_listing), patch(
+        "newsletter.pipeline.Paper.afrom_url",
+        side_effect=lambda url, **kw: make_paper(url),
+    ), patch("newsletter.pipeline.Paper.query_google", _noop), pytest.raises(
+        RuntimeError
+    ):
+        asyncio.run(pipeline.main(str(tmp_path / "out.jsonl")))
+    assert not (tmp_path / "out.jsonl").exists()
+    assert (tmp_path / "out.jsonl.journal").exists()
+
+
+def test_resume_skips_finished_work(tmp_path, make_paper):
+    out = tmp_path / "out.jsonl"
+    finished = make_paper("u1")
+    finished.google_results = ["g"]
+    (tmp_path / "out.jsonl.partial").write_text(json.dumps(finished.to_dict()) + "\n")
+    # The last journal line was cut short by the crash
+    (tmp_path / "out.jsonl.journal").write_text(
+        json.dumps({"fetched": make_paper("u1").to_dict()})
+        + "\n"
+        + json.dumps({"fetched": make_paper("u2").to_dict()})
+        + "\n"
+        + '{"fetched": {"arxiv_'
+    )
+    fetched, searched = [], []
+
+    async def fake_afrom_url(url, **kwargs):
+        fetched.append(url)
+        return make_paper(url)
+
+    def search(self, num_results=10):
+        searched.append(self.arxiv_url)
+        self.google_results = []
+
+    with patch.object(
+        pipeline, "aiter_recent_listings", _listing(["u1", "u2", "u3"])
+    ), patch("newsletter.pipeline.Paper.afrom_url", side_effect=fake_afrom_url), patch(
+        "newsletter.pipeline.Paper.query_google", search
+    ):
+        asyncio.run(pipeline.main(str(out), resume=True))
+
+    assert fetched == ["u3"]
+    assert sorted(searched) == ["u2", "u3"]
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [d["arxiv_url"] for d in lines] == ["u1", "u2", "u3"]
+    assert not (tmp_path / "out.jsonl.partial").exists()
+    assert not (tmp_path / "out.jsonl.journal").exists()
+
+
+def test_read_lines_truncates_partial_line(tmp_path):
+    path = tmp_path / "journal"
+    path.write_text('{"a": 1}\n{"b":')
+    assert pipeline._read_lines(str(path)) == [{"a": 1}]
+    assert path.read_text() == '{"a": 1}\n'
+    assert pipeline._read_lines(str(tmp_path / "missing")) == []
+
+
+def test_write_scored_sorts_and_applies_listed_categories(tmp_path):
+    staged = tmp_path / "staged.jsonl"
+    records = [
+        {
+            "arxiv_url": f"https://arxiv.org/abs/{i}",
+            "title": "t",
+            "abstract": "",
+            "authors": [],
+            "submission_date": "2024-01-01",
+            "google_results": ["g"] * hits,
+            "categories": ["cs.AI"],
+        }
+        for i, hits in enumerate([1, 3, 0])
+    ]
+    staged.write_text("".join(json.dumps(r) + "\n" for r in records))
+    listed = {"https://arxiv.org/abs/1": ["cs.AI", "cs.LG"]}
+
+    with patch.object(pipeline, "SCORE_CHUNK", 2):
+        ids = pipeline.write_scored(str(staged), str(tmp_path / "out.jsonl"), listed)
+
+    assert ids == ["1", "0", "2"]
+    lines = (tmp_path / "out.jsonl").read_text().splitlines()
+    data = [json.loads(line) for line in lines]
+    assert data[0]["categories"] == ["cs.AI", "cs.LG"]
+    assert [d["combined_score"] for d in data] == pytest.approx([2.25, 0.75, 0.0])
+
+
+def test_interrupted_write_keeps_the_previous_output(tmp_path, monkeypatch, make_paper):
+    monkeypatch.delenv("NEWSLETTER_CACHE_DIR", raising=False)
+    staged = tmp_path / "out.jsonl.partial"
+    staged.write_text(
+        "".join(json.dumps(make_paper(url).to_dict()) + "\n" for url in ("u1", "u2"))
+    )
+    out = tmp_path / "out.jsonl"
+    out.write_text("previous\n")
+    with patch.object(
+        pipeline.cache, "update_paper", side_effect=[None, OSError]
+    ), pytest.raises(OSError):
+        pipeline.write_scored(str(staged), str(out), {})
+    assert out.read_text() == "previous\n"
+
+    pipeline.write_scored(str(staged), str(out), {})
+    pipeline.save_manifest(str(tmp_path / "manifest.json"), ["1"])
+    assert len(out.read_text().splitlines()) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "manifest.json",
+        "out.jsonl",
+        "out.jsonl.partial",
+    ]
+
+
+def test_merge_duplicate_reuses_search_results(tmp_path, monkeypatch):
+    from newsletter import cache
+
+    monkeypatch.setenv("NEWSLETTER_CACHE_DIR", str(tmp_path))
+    abstract = "We study sparse attention for long documents in language models."
+    cache.set_paper(
+        "old",
+        {"title": "Sparse attention", "abstract": abstract, "google_results": ["g"]},
+    )
+    cache.flush()
+    paper = Paper(
+        arxiv_url="new",
+        title="Sparse attention",
+        abstract=abstract,
+        authors=[],
+        submission_date=date(2024, 1, 1),
+    )
+
+    assert pipeline.merge_duplicate(paper, skip=True) is None
+    assert pipeline.merge_duplicate(paper) is paper
+    assert paper.google_results == ["g"]
+    assert cache.get_paper("new")["google_results"] == ["g"]
+
+
+def test_parse_args_duplicates():
+    assert pipeline.parse_args([]).duplicates == "merge"
+    args = pipeline.parse_args(["--duplicates", "skip"])
+    assert args.duplicates == "skip"
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+
+from newsletter import cache, query
+from newsletter.paper import Paper
+
+
+@pytest.fixture
+def fill_papers(fill_cache, make_paper):
+    """Return a function caching three papers and a response that is not one."""
+
+    def fill():
+        papers = (
+            ("u1", "Graph neural networks", ["Doe, Jane", "Roe, Rick"], 1),
+            ("u2", "Neural scaling laws", ["Jane Doe"], 10),
+            ("u3", "Protein folding", ["Roe, Rick"], 20),
+        )
+        fill_cache(
+            {
+                url: make_paper(url, day=day, title=title, authors=authors).to_dict()
+                for url, title, authors, day in papers
+            }
+        )
+        cache.set_response("listing", {}, {"not": "a paper"})
+
+    return fill
+
+
+def test_normalize_author_ignores_name_order_and_case():
+    assert query.normalize_author("Doe,  Jane") == "jane doe"
+    assert query.normalize_author("JANE Doe") == "jane doe"
+
+
+def test_find_by_author_date_and_keywords(fill_papers):
+    fill_papers()
+    assert query.find_urls(author="Jane Doe") == ["u2", "u1"]
+    assert query.find_urls(since=date(2024, 1, 5)) == ["u3", "u2"]
+    assert query.find_urls(until=date(2024, 1, 10), author="rick roe") == ["u1"]
+    assert query.find_urls(keywords="neural") == ["u2", "u1"]
+    assert query.find_urls(keywords="the neural graph") == ["u1"]
+    assert query.find_urls(limit=1) == ["u3"]
+    assert query.find_urls(author="Nobody") == []
+
+
+def test_find_papers_yields_lazily(fill_papers):
+    fill_papers()
+    found = query.find_papers(author="Doe, Jane")
+    first = next(found)
+    assert isinstance(first, Paper)
+    assert first.title == "Neural scaling laws"
+    cache.update_paper("u1", {"google_results": ["g"]})
+    assert next(found).google_results == ["g"]
+    assert next(found, None) is None
+
+
+def test_changed_and_evicted_papers_are_reindexed(monkeypatch, fill_papers):
+    clock = iter(range(100))
+    monkeypatch.setattr(cache, "_now", lambda: float(next(clock)))
+    fill_papers()
+    cache.update_paper("u3", {"authors": ["Jane Doe"]})
+    assert query.find_urls(author="Jane Doe") == ["u3", "u2", "u1"]
+    assert query.find_urls(author="Rick Roe") == ["u1"]
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 1)
+    cache.get_paper("u2")
+    cache.flush()
+    assert query.find_urls() == ["u2"]
+
+
+def test_find_without_cache_dir(monkeypatch):
+    monkeypatch.delenv("NEWSLETTER_CACHE_DIR", raising=False)
+    assert list(query.find_papers(author="Jane Doe")) == []
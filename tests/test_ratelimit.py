@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from newsletter import ratelimit
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, response):
+        super().__init__("failed")
+        self.response = response
+
+
+def test_token_bucket_waits_when_empty():
+    bucket = ratelimit.TokenBucket(rate=2.0, capacity=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.05)
+
+
+def test_token_bucket_throttle_and_recover():
+    bucket = ratelimit.TokenBucket(rate=4.0, capacity=4)
+    bucket.throttle(pause=10)
+    assert bucket.rate == 2.0
+    assert bucket.reserve() > 9
+    for _ in range(20):
+        bucket.recover()
+    assert bucket.rate == 4.0
+
+
+def test_parse_retry_after():
+    assert ratelimit.parse_retry_after("5") == 5.0
+    assert ratelimit.parse_retry_after(None) is None
+    assert ratelimit.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert ratelimit.parse_retry_after("garbage") is None
+
+
+def test_backoff_delay_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BASE_DELAY", 1.0)
+    assert 0.5 <= ratelimit.backoff_delay(0) <= 1.0
+    assert 4.0 <= ratelimit.backoff_delay(3) <= 8.0
+    assert ratelimit.backoff_delay(20) <= ratelimit.MAX_DELAY
+
+
+def test_call_retries_throttled_responses():
+    throttled = Mock(status_code=429, headers={"Retry-After": "0"})
+    ok = Mock(status_code=200, headers={})
+    func = Mock(side_effect=[throttled, throttled, ok])
+    assert ratelimit.call("example.com", func) is ok
+    assert func.call_count == 3
+
+
+def test_call_gives_up_and_reraises(monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_RETRIES", 2)
+    error = FakeHTTPError(Mock(status_code=503, headers={}))
+    func = Mock(side_effect=error)
+    with pytest.raises(FakeHTTPError):
+        ratelimit.call("example.com", func)
+    assert func.call_count == 3
+
+
+def test_call_does_not_retry_client_errors():
+    missing = Mock(status_code=404, headers={})
+    func = Mock(return_value=missing)
+    assert ratelimit.call("example.com", func) is missing
+    func.assert_called_once()
+
+
+def test_call_throttles_configured_host(monkeypatch):
+    monkeypatch.setattr(ratelimit, "LIMITS", {"example.com": (8.0, 2)})
+    ratelimit.reset()
+    throttled = Mock(status_code=429, headers={"Retry-After": "0"})
+    ok = Mock(status_code=200, headers={})
+    ratelimit.call("example.com", Mock(side_effect=[throttled, ok]))
+    bucket = ratelimit.bucket_for("example.com")
+    assert bucket.rate == pytest.approx(4.0 + 0.8)
+
+
+def test_acall_retries():
+    responses = [Mock(status_code=502, headers={}), Mock(status_code=200, headers={})]
+
+    async def func():
+        return responses.pop(0)
+
+    result = asyncio.run(ratelimit.acall("example.com", func))
+    assert result.status_code == 200
@@ -0,0 +1,56 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from newsletter import scoring
+
+
+def test_default_score_is_google_hits_over_mean(make_paper):
+    papers = [make_paper("u1", hits=1), make_paper("u2", hits=3), make_paper("u3")]
+    scores = scoring.score_papers(papers)
+    assert scores == pytest.approx([0.75, 2.25, 0.0])
+    assert [p.combined_score for p in papers] == pytest.approx([0.75, 2.25, 0.0])
+
+
+def test_signals(make_paper):
+    papers = [
+        make_paper("u1", day=10, authors=["a", "b"], categories=["cs.AI", "math.OC"]),
+        make_paper("u2", day=1, authors=["c"], categories=["cs.LG", "cs.CL"]),
+    ]
+    matrix = scoring.signal_matrix(
+        papers, ["recency", "authors", "categories"], today=date(2024, 1, 10)
+    )
+    np.testing.assert_allclose(matrix, [[1.0, 0.1], [2, 1], [1, 2]])
+
+
+def test_normalizations():
+    values = np.array([[1.0, 2.0, 2.0, 5.0]])
+    np.testing.assert_allclose(scoring._mean(values), [[0.4, 0.8, 0.8, 2.0]])
+    np.testing.assert_allclose(scoring._rank(values), [[0, 0.5, 0.5, 1]])
+    z = scoring._zscore(values)
+    assert z.mean() == pytest.approx(0.0)
+    assert z.std() == pytest.approx(1.0)
+    np.testing.assert_array_equal(scoring._zscore(np.ones((1, 3))), [[0, 0, 0]])
+
+
+def test_weighted_combination_with_per_signal_normalization(make_paper):
+    papers = [
+        make_paper("u1", hits=2, authors=["a"]),
+        make_paper("u2", authors=["a", "b"]),
+    ]
+    scoring.score_papers(
+        papers,
+        weights={"google": 2.0, "authors": 1.0},
+        normalization={"google": "mean", "authors": "rank"},
+    )
+    assert [p.combined_score for p in papers] == pytest.approx([4.0, 1.0])
+
+
+def test_unknown_signal_raises(make_paper):
+    with pytest.raises(ValueError):
+        scoring.score_papers([make_paper("u1")], weights={"missing": 1.0})
+
+
+def test_empty_input():
+    assert scoring.score_papers([]).shape == (0,)
@@ -1,7 +1,14 @@
 import datetime
+import sys
 from bs4 import BeautifulSoup
 
-from newsletter.utils import extract_meta, serialize_paper
+from newsletter.utils import (
+    extract_meta,
+    deserialize_paper,
+    parse_citation_meta,
+    serialize_paper,
+    soup_citation_meta,
+)
 from newsletter.paper import Paper
 
 
@@ -28,3 +35,71 @@ def test_serialize_paper_converts_date():
     data = serialize_paper(p)
     assert data["submission_date"] == "2024-01-01"
     assert data["google_results"] == ["g"]
+
+
+def test_parse_citation_meta_collects_repeated_tags():
+    html = """<html><head>
+    <meta name="citation_title" content="A &amp; B">
+    <meta name="citation_author" content="X" />
+    <meta name="citation_author" content="Y" />
+    <meta name="description" content="ignored">
+    </head><body></body></html>"""
+    assert parse_citation_meta(html) == {
+        "citation_title": ["A & B"],
+        "citation_author": ["X", "Y"],
+    }
+
+
+def test_parse_citation_meta_stops_at_head_end():
+    html = """<html><head><meta name="citation_title" content="T"></head>
+    <body><meta name="citation_author" content="Z"></body></html>"""
+    assert parse_citation_meta(html) == {"citation_title": ["T"]}
+
+
+def test_soup_citation_meta_searches_whole_document():
+    html = """<html><body><meta name="citation_title" content="T">
+    <meta name="citation_author" content="Z"></body></html>"""
+    assert parse_citation_meta(html) == {}
+    assert soup_citation_meta(html) == {
+        "citation_title": ["T"],
+        "citation_author": ["Z"],
+    }
+
+
+def test_deserialize_paper_roundtrip():
+    p = Paper(
+        arxiv_url="u",
+        title="t",
+        abstract="a",
+        authors=["x"],
+        submission_date=datetime.date(2024, 1, 1),
+        google_results=["g"],
+    )
+    restored = deserialize_paper(serialize_paper(p))
+    assert restored == p
+
+
+def test_paper_to_dict_shares_lists_and_interns_authors():
+    name = "".join(["Ye, ", "Rui"])
+    p = Paper(
+        arxiv_url="u",
+        title="t",
+        abstract="a",
+        authors=[name],
+        submission_date=datetime.date(2024, 1, 1),
+    )
+    data = p.to_dict()
+    assert data["authors"] is p.authors
+    assert p.authors[0] is sys.intern("Ye, Rui")
+    assert Paper.from_dict(data) == p
+    assert not hasattr(p, "__dict__")
+
+
+def test_dumps_matches_without_orjson(monkeypatch):
+    from newsletter import utils
+
+    data = {"title": "Ünïcode", "authors": ["a"], "score": 1.5}
+    fast = utils.dumps(data)
+    monkeypatch.setattr(utils, "orjson", None)
+    assert utils.dumps(data) == fast
+    assert utils.loads(fast) == data